@@ -67,8 +67,9 @@ TqSdk 是信易科技开源的 Python 量化交易开发包，面向国内期货
       https://doc.shinnytech.com/tqsdk/latest/reference/tqsdk.api.html#tqsdk.api.TqApi.TargetPosTask
 """
 
+from collections import deque
+
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import ma, crossup, crossdown
 
 # ===================== 策略参数 =====================
 SYMBOL = "SHFE.rb2501"     # 交易合约：上期所螺纹钢2501合约
@@ -79,6 +80,52 @@ VOLUME = 1                  # 持仓手数（正数=多头，负数=空头，0=
 # ===================================================
 
 
+class RollingMA:
+    """
+    滑动窗口简单均线（增量更新）。
+
+    维护窗口内收盘价之和：每根新 K 线只需加入新价格、移出最旧价格，
+    每次更新都是 O(1)，不必对整段 K 线重新调用 ma()。
+    """
+
+    __slots__ = ("period", "_buf", "_sum", "_nan")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period: int):
+        self.period = period
+        self._buf = deque(maxlen=period)   # 窗口内的收盘价
+        self._sum = 0.0                    # 窗口内非 NaN 收盘价之和
+        self._nan = 0                      # 窗口内 NaN 的个数（新上市合约开头的 K 线没有数据）
+
+    def push(self, price: float):
+        """新 K 线：移出窗口最旧的价格，加入新价格"""
+        if len(self._buf) == self.period:
+            old = self._buf[0]
+            if old != old:
+                self._nan -= 1
+            else:
+                self._sum -= old
+        self._buf.append(price)
+        if price != price:
+            self._nan += 1
+        else:
+            self._sum += price
+
+    def seed(self, prices):
+        """用一段历史收盘价（ndarray）一次性建立窗口，代替逐根 push"""
+        window = prices[-self.period:]
+        valid = window[window == window]   # 去掉无数据的 K 线（NaN）
+        self._buf = deque(window.tolist(), maxlen=self.period)
+        self._sum = float(valid.sum())
+        self._nan = len(window) - len(valid)
+
+    @property
+    def value(self) -> float:
+        """当前均线值（窗口未填满或含 NaN 时返回 nan，与 ma() 一致）"""
+        if len(self._buf) < self.period or self._nan:
+            return float("nan")
+        return self._sum / self.period
+
+
 def main():
     """
     策略主函数
@@ -103,27 +150,55 @@ def main():
     target_pos = TargetPosTask(api, SYMBOL)
     # ================================
 
+    # ---- 增量均线状态 ----
+    ma_short = RollingMA(SHORT_PERIOD)
+    ma_long = RollingMA(LONG_PERIOD)
+    last_bar_id = None   # 上次计入均线的已完成 K 线 id
+
     print(f"[策略启动] 双均线策略 | 合约: {SYMBOL} | 短周期: {SHORT_PERIOD} | 长周期: {LONG_PERIOD}")
 
+    # 循环内每次唤醒都会用到的方法先绑定为局部变量，省去逐次属性查找
+    wait_update = api.wait_update
+    is_changing = api.is_changing
+
     while True:
         # 等待行情数据更新
-        api.wait_update()
+        wait_update()
 
-        # 仅在 K 线有更新时重新计算信号
-        if not api.is_changing(klines):
+        # 仅在新 K 线出现（即上一根 K 线刚刚完成）时重新计算信号，
+        # 形成中 K 线的逐笔变动直接跳过
+        if not is_changing(klines.iloc[-1], "datetime"):
             continue
 
-        # ---- 计算技术指标 ----
-        ma_short = ma(klines.close, SHORT_PERIOD)   # 短期均线序列
-        ma_long = ma(klines.close, LONG_PERIOD)     # 长期均线序列
-
-        is_golden_cross = crossup(ma_short, ma_long).iloc[-1]   # 金叉信号
-        is_death_cross = crossdown(ma_short, ma_long).iloc[-1]  # 死叉信号
+        # 每根 K 线只取一次底层 ndarray（不复制），后续都在数组上按下标取值
+        close_arr = klines["close"].to_numpy(copy=False)
+        id_arr = klines["id"].to_numpy(copy=False)
+        bar_id = int(id_arr[-2])          # 刚完成的 K 线
+        last_close = close_arr[-2]        # 刚完成 K 线的收盘价
+
+        # ---- 增量更新均线 ----
+        if last_bar_id is None or bar_id != last_bar_id + 1:
+            # 首次运行（或中间漏掉了 K 线）：用之前的已完成 K 线重建均线窗口
+            history = close_arr[-(LONG_PERIOD + 2):-2]
+            ma_short = RollingMA(SHORT_PERIOD)
+            ma_long = RollingMA(LONG_PERIOD)
+            ma_short.seed(history)
+            ma_long.seed(history)
+
+        prev_diff = ma_short.value - ma_long.value   # 上一根 K 线的 (短均线 - 长均线)
+        ma_short.push(last_close)
+        ma_long.push(last_close)
+        last_bar_id = bar_id
+
+        # ---- 计算交叉信号：比较前后两根 K 线的均线差符号 ----
+        cur_diff = ma_short.value - ma_long.value
+        is_golden_cross = prev_diff <= 0 and cur_diff > 0   # 金叉信号
+        is_death_cross = prev_diff >= 0 and cur_diff < 0    # 死叉信号
 
         print(
-            f"最新价: {klines.close.iloc[-1]:.2f} | "
-            f"MA{SHORT_PERIOD}: {ma_short.iloc[-1]:.2f} | "
-            f"MA{LONG_PERIOD}: {ma_long.iloc[-1]:.2f}"
+            f"收盘价: {last_close:.2f} | "
+            f"MA{SHORT_PERIOD}: {ma_short.value:.2f} | "
+            f"MA{LONG_PERIOD}: {ma_long.value:.2f}"
         )
 
         # ---- 交易信号处理（用 TargetPosTask 设置目标仓位）----
@@ -61,8 +61,10 @@ TqSdk 是信易科技开源的 Python 量化交易开发包，面向国内期货
 文档：https://doc.shinnytech.com/tqsdk/latest/
 """
 
+import math
+from collections import deque
+
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import ma, std
 
 # ===================== 策略参数 =====================
 SYMBOL = "DCE.m2501"
@@ -73,6 +75,77 @@ VOLUME = 1
 MIN_BAND_WIDTH = 0.01
 # ===================================================
 
+class RollingBand:
+    """
+    滑动窗口均值 / 标准差（增量更新）。
+
+    维护窗口内价格之和 s1 与平方和 s2：
+        均值   = s1 / N
+        方差   = (s2 - s1 × 均值) / (N - 1)   （样本方差，与 tafunc.std 一致）
+    每根新 K 线加入新价格、移出最旧价格，每次更新 O(1)，
+    不必对整段 K 线重新调用 ma() / std()。
+    s1 / s2 只累加非 NaN 价格，窗口内有 NaN（无数据的 K 线）时返回 NaN，移出后自动恢复；
+    每 RECALC_EVERY 次更新从窗口重新求和一次，消除加减累积的浮点误差。
+    """
+
+    __slots__ = ("period", "_buf", "_s1", "_s2", "_nan", "_updates")   # 固定属性，省去实例 __dict__
+
+    RECALC_EVERY = 1000
+
+    def __init__(self, period: int):
+        self.period = period
+        self._buf = deque(maxlen=period)   # 窗口内的收盘价
+        self._s1 = 0.0                     # 非 NaN 价格之和
+        self._s2 = 0.0                     # 非 NaN 价格平方和
+        self._nan = 0                      # 窗口内 NaN 的个数
+        self._updates = 0                  # 距上次重新求和的更新次数
+
+    def push(self, price: float):
+        """新 K 线：移出窗口最旧的价格，加入新价格"""
+        if len(self._buf) == self.period:
+            old = self._buf[0]
+            if old != old:
+                self._nan -= 1
+            else:
+                self._s1 -= old
+                self._s2 -= old * old
+        self._buf.append(price)
+        if price != price:
+            self._nan += 1
+        else:
+            self._s1 += price
+            self._s2 += price * price
+
+        self._updates += 1
+        if self._updates >= self.RECALC_EVERY:
+            self._recalc()
+
+    def _recalc(self):
+        """从窗口内的数据重新计算 s1 / s2"""
+        valid = [v for v in self._buf if v == v]
+        self._s1 = sum(valid)
+        self._s2 = sum(v * v for v in valid)
+        self._updates = 0
+
+    def seed(self, prices):
+        """用一段历史收盘价（ndarray）一次性建立窗口，代替逐根 push"""
+        window = prices[-self.period:]
+        valid = window[window == window]   # 去掉无数据的 K 线（NaN）
+        self._buf = deque(window.tolist(), maxlen=self.period)
+        self._s1 = float(valid.sum())
+        self._s2 = float(valid.dot(valid))
+        self._nan = len(window) - len(valid)
+        self._updates = 0
+
+    def mean_std(self):
+        """返回 (均值, 标准差)，窗口未填满或含 NaN 时返回 (nan, nan)"""
+        if len(self._buf) < self.period or self._nan:
+            return float("nan"), float("nan")
+        mean = self._s1 / self.period
+        var = max((self._s2 - self._s1 * mean) / (self.period - 1), 0.0)  # 防止浮点误差出现负方差
+        return mean, math.sqrt(var)
+
+
 def main():
     api = TqApi(account=TqSim(), auth=TqAuth("YOUR_ACCOUNT", "YOUR_PASSWORD"))
     klines = api.get_kline_serial(SYMBOL, KLINE_DUR, data_length=N_PERIOD + 10)
@@ -80,23 +153,39 @@ def main():
     # TargetPosTask：声明目标仓位，自动追单直到达到目标
     target_pos = TargetPosTask(api, SYMBOL)
 
+    band = RollingBand(N_PERIOD)
+    last_bar_id = None   # 上次计入窗口的已完成 K 线 id
+    last_target = None   # 最近一次设置的目标仓位
+
     print(f"[布林带突破] 启动 | {SYMBOL} | 周期:{N_PERIOD} | 倍数:{K_TIMES}")
 
+    # 循环内每次唤醒都会用到的方法先绑定为局部变量，省去逐次属性查找
+    wait_update = api.wait_update
+    is_changing = api.is_changing
+
     while True:
-        api.wait_update()
-        if not api.is_changing(klines):
+        wait_update()
+        # 仅在新 K 线出现（上一根 K 线刚完成）时计算，形成中 K 线的逐笔变动直接跳过
+        if not is_changing(klines.iloc[-1], "datetime"):
             continue
 
-        close = klines.close
-        middle = ma(close, N_PERIOD)          # 中轨
-        std_dev = std(close, N_PERIOD)        # 标准差
-        upper = middle + K_TIMES * std_dev    # 上轨
-        lower = middle - K_TIMES * std_dev    # 下轨
-
-        last_close  = close.iloc[-1]
-        last_upper  = upper.iloc[-1]
-        last_lower  = lower.iloc[-1]
-        last_middle = middle.iloc[-1]
+        # 每根 K 线只取一次底层 ndarray（不复制），后续都在数组上按下标取值
+        close_arr = klines["close"].to_numpy(copy=False)
+        id_arr = klines["id"].to_numpy(copy=False)
+        bar_id = int(id_arr[-2])          # 刚完成的 K 线
+        last_close = close_arr[-2]        # 刚完成 K 线的收盘价
+
+        # ---- 增量更新均值 / 标准差 ----
+        if last_bar_id is None or bar_id != last_bar_id + 1:
+            # 首次运行（或中间漏掉了 K 线）：用之前的已完成 K 线重建窗口
+            band = RollingBand(N_PERIOD)
+            band.seed(close_arr[-(N_PERIOD + 1):-2])
+        band.push(last_close)
+        last_bar_id = bar_id
+
+        last_middle, std_dev = band.mean_std()       # 中轨、标准差
+        last_upper = last_middle + K_TIMES * std_dev  # 上轨
+        last_lower = last_middle - K_TIMES * std_dev  # 下轨
         band_width  = (last_upper - last_lower) / last_middle  # 归一化带宽
 
         print(f"价格:{last_close:.2f} 上轨:{last_upper:.2f} 中轨:{last_middle:.2f} 下轨:{last_lower:.2f} 带宽:{band_width:.3f}")
@@ -106,24 +195,21 @@ def main():
             continue
 
         if last_close > last_upper:
-            # 上轨突破 → 做多
-            print(">>> 突破上轨，做多")
-            target_pos.set_target_volume(VOLUME)
-
+            target, reason = VOLUME, "突破上轨，做多"      # 上轨突破 → 做多
         elif last_close < last_lower:
-            # 下轨跌破 → 做空
-            print(">>> 跌破下轨，做空")
-            target_pos.set_target_volume(-VOLUME)
-
+            target, reason = -VOLUME, "跌破下轨，做空"     # 下轨跌破 → 做空
         elif last_close < last_middle:
-            # 价格跌回中轨以下，多头离场
-            print(">>> 回落中轨，平多")
-            target_pos.set_target_volume(0)
-
+            target, reason = 0, "回落中轨，平多"           # 价格跌回中轨以下，多头离场
         elif last_close > last_middle:
-            # 价格涨回中轨以上，空头离场
-            print(">>> 反弹中轨，平空")
-            target_pos.set_target_volume(0)
+            target, reason = 0, "反弹中轨，平空"           # 价格涨回中轨以上，空头离场
+        else:
+            continue
+
+        # 连续多根 K 线保持同一信号时，目标仓位不变，不再重复下达和打印
+        if target != last_target:
+            print(f">>> {reason}")
+            target_pos.set_target_volume(target)
+            last_target = target
 
     api.close()
 
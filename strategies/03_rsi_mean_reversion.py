@@ -55,7 +55,6 @@ RSI 超买超卖均值回归策略 (RSI Mean Reversion Strategy)
 文档：https://doc.shinnytech.com/tqsdk/latest/
 """
 
-import pandas as pd
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
 
 # ===================== 策略参数 =====================
@@ -67,15 +66,63 @@ KLINE_DUR = 60 * 15
 VOLUME = 1
 # ===================================================
 
-def calc_rsi(close_series: pd.Series, period: int) -> pd.Series:
-    """计算 RSI（Wilder 平滑方法）"""
-    delta = close_series.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.ewm(alpha=1.0 / period, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1.0 / period, adjust=False).mean()
-    rs = avg_gain / avg_loss.replace(0, float("inf"))
-    return 100 - 100 / (1 + rs)
+class WilderRSI:
+    """
+    Wilder RSI 增量计算器。
+
+    每根已完成 K 线只把它的涨跌幅递推进 avg_gain / avg_loss，
+    计算量 O(1)，不必对整段 K 线重跑 diff / clip / ewm。
+    """
+
+    __slots__ = ("alpha", "avg_gain", "avg_loss", "prev_close")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period: int):
+        self.alpha = 1.0 / period
+        self.avg_gain = None     # 平均涨幅
+        self.avg_loss = None     # 平均跌幅
+        self.prev_close = None   # 最近一根已完成 K 线的收盘价
+
+    def push(self, price: float):
+        """一根 K 线完成：把它相对上一根的涨跌幅计入平滑均值"""
+        if price != price:       # 跳过无数据的 K 线（NaN）
+            return
+        if self.prev_close is not None:
+            delta = price - self.prev_close
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            if self.avg_gain is None:
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain += self.alpha * (gain - self.avg_gain)
+                self.avg_loss += self.alpha * (loss - self.avg_loss)
+        self.prev_close = price
+
+    def seed(self, prices):
+        """用一段历史收盘价（ndarray）建立平滑状态，涨跌幅整段向量化求出，只剩递推逐根进行"""
+        prices = prices[prices == prices]   # 去掉无数据的 K 线（NaN）
+        if len(prices) == 0:
+            return
+        deltas = prices[1:] - prices[:-1]
+        gains = deltas.clip(min=0).tolist()
+        losses = (-deltas).clip(min=0).tolist()
+        if gains:
+            g, l = gains[0], losses[0]
+            a = self.alpha
+            for gain, loss in zip(gains[1:], losses[1:]):
+                g += a * (gain - g)
+                l += a * (loss - l)
+            self.avg_gain, self.avg_loss = g, l
+        self.prev_close = float(prices[-1])
+
+    @property
+    def value(self) -> float:
+        """当前 RSI（数据不足时返回 nan）"""
+        if self.avg_gain is None:
+            return float("nan")
+        if self.avg_loss == 0:
+            return 100.0         # 没有下跌，RSI 取上限
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
 
 def main():
     api = TqApi(account=TqSim(), auth=TqAuth("YOUR_ACCOUNT", "YOUR_PASSWORD"))
@@ -84,34 +131,54 @@ def main():
     # TargetPosTask：声明目标仓位，自动追单
     target_pos = TargetPosTask(api, SYMBOL)
 
+    rsi_calc = WilderRSI(RSI_PERIOD)
+    last_bar_id = None   # 上次计入状态的已完成 K 线 id
+    last_target = None   # 最近一次设置的目标仓位
+
     print(f"[RSI均值回归] 启动 | {SYMBOL} | RSI周期:{RSI_PERIOD} | 超卖:{OVERSOLD} | 超买:{OVERBOUGHT}")
 
+    # 循环内每次唤醒都会用到的方法先绑定为局部变量，省去逐次属性查找
+    wait_update = api.wait_update
+    is_changing = api.is_changing
+
     while True:
-        api.wait_update()
-        if not api.is_changing(klines):
+        wait_update()
+        # 仅在新 K 线出现（上一根 K 线刚完成）时计算，形成中 K 线的逐笔变动直接跳过
+        if not is_changing(klines.iloc[-1], "datetime"):
             continue
 
-        rsi_series = calc_rsi(klines.close, RSI_PERIOD)
-        rsi = rsi_series.iloc[-1]
-        if pd.isna(rsi):
+        # 每根 K 线只取一次底层 ndarray（不复制），后续都在数组上按下标取值
+        close_arr = klines["close"].to_numpy(copy=False)
+        id_arr = klines["id"].to_numpy(copy=False)
+        bar_id = int(id_arr[-2])          # 刚完成的 K 线
+        if last_bar_id is None or bar_id != last_bar_id + 1:
+            # 首次运行（或中间漏掉了 K 线）：用之前的已完成 K 线建立平滑状态
+            rsi_calc = WilderRSI(RSI_PERIOD)
+            rsi_calc.seed(close_arr[:-2])
+        # 把刚完成的 K 线计入状态
+        rsi_calc.push(close_arr[-2])
+        last_bar_id = bar_id
+
+        rsi = rsi_calc.value
+        if rsi != rsi:   # NaN 是唯一不等于自身的浮点数，即预热未完成
             continue
 
         print(f"RSI: {rsi:.2f}")
 
         if rsi < OVERSOLD:
-            # 超卖 → 做多
-            print(f">>> RSI={rsi:.1f} 超卖，做多")
-            target_pos.set_target_volume(VOLUME)
-
+            target, reason = VOLUME, "超卖，做多"      # 超卖 → 做多
         elif rsi > OVERBOUGHT:
-            # 超买 → 做空
-            print(f">>> RSI={rsi:.1f} 超买，做空")
-            target_pos.set_target_volume(-VOLUME)
-
+            target, reason = -VOLUME, "超买，做空"     # 超买 → 做空
         elif 40 < rsi < 60:
-            # RSI 回归中性区，平仓
-            print(f">>> RSI={rsi:.1f} 回归中性，平仓")
-            target_pos.set_target_volume(0)
+            target, reason = 0, "回归中性，平仓"       # RSI 回归中性区，平仓
+        else:
+            continue
+
+        # 连续多根 K 线保持同一信号时，目标仓位不变，不再重复下达和打印
+        if target != last_target:
+            print(f">>> RSI={rsi:.1f} {reason}")
+            target_pos.set_target_volume(target)
+            last_target = target
 
     api.close()
 
@@ -51,7 +51,6 @@ Dual Thrust 日内突破用于演示如何把一个明确的交易想法落到 T
 文档：https://doc.shinnytech.com/tqsdk/latest/
 """
 
-from datetime import time
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
 
 # ===================== 策略参数 =====================
@@ -72,53 +71,65 @@ def main():
     # TargetPosTask：声明目标仓位，自动处理下单细节
     target_pos = TargetPosTask(api, SYMBOL)
 
-    today_date = None
+    # 强平时刻预先格式化为定长 "HH:MM:SS"，循环内直接与行情时间字符串比较（定长时可按字典序比较）
+    close_cutoff = f"{CLOSE_HOUR:02d}:{CLOSE_MINUTE:02d}:00"
+    last_day_id = None
     buy_line = sell_line = None
 
     print(f"[Dual Thrust] 启动 | {SYMBOL} | N={N_DAYS} | K1={K1} | K2={K2}")
 
+    # 循环内每次唤醒都会用到的方法先绑定为局部变量，省去逐次属性查找
+    wait_update = api.wait_update
+    is_changing = api.is_changing
+    set_target_volume = target_pos.set_target_volume
+
     while True:
-        api.wait_update()
+        wait_update()
+        # 只关心本合约行情：持仓、委托等其他对象的更新唤醒直接跳过
+        if not is_changing(quote):
+            continue
 
         if not quote.datetime:
             continue
 
-        current_date = quote.datetime[:10]
-
-        # 新交易日：重新计算轨道
-        if current_date != today_date:
-            today_date = current_date
+        # 新交易日：日线最后一根 K 线的 id 变化即为换日，用整数比较代替日期字符串切片
+        day_id = int(daily_klines["id"].to_numpy(copy=False)[-1])
+        if day_id != last_day_id:
+            last_day_id = day_id
+            today_date = quote.datetime[:10]
             today_open = quote.open
-            hist_high  = daily_klines.high.iloc[-(N_DAYS + 1):-1]
-            hist_low   = daily_klines.low.iloc[-(N_DAYS + 1):-1]
-            hist_close = daily_klines.close.iloc[-(N_DAYS + 1):-1]
-            hh = hist_high.max()
-            ll = hist_low.min()
-            lc = hist_close.min()
-            hc = hist_close.max()
+            # 前 N 日的最高/最低/收盘一次性取成 ndarray（不含当日），再在数组上求极值
+            hist = daily_klines[["high", "low", "close"]].values[-(N_DAYS + 1):-1]
+            hh = hist[:, 0].max()
+            ll = hist[:, 1].min()
+            lc = hist[:, 2].min()
+            hc = hist[:, 2].max()
             price_range = max(hh - lc, hc - ll)
-            buy_line  = today_open + K1 * price_range   # 上轨
-            sell_line = today_open - K2 * price_range   # 下轨
+            # 轨道存为 Python float，之后每个 tick 的比较不再涉及 numpy 标量
+            buy_line  = float(today_open + K1 * price_range)   # 上轨
+            sell_line = float(today_open - K2 * price_range)   # 下轨
             print(f"[{today_date}] 开盘:{today_open} 上轨:{buy_line:.2f} 下轨:{sell_line:.2f}")
 
         if buy_line is None:
             continue
 
         last_price = quote.last_price
-        t = time(*[int(x) for x in quote.datetime[11:19].split(":")])
-
         # 收盘前强制平仓
-        if t >= time(CLOSE_HOUR, CLOSE_MINUTE):
-            target_pos.set_target_volume(0)
+        if quote.datetime[11:19] >= close_cutoff:
+            set_target_volume(0)
+            continue
+
+        # 最新价没有变化（例如只是盘口或成交量变动）时不必重新判断突破
+        if not is_changing(quote, "last_price"):
             continue
 
         # 突破上轨 → 做多
         if last_price > buy_line:
-            target_pos.set_target_volume(VOLUME)
+            set_target_volume(VOLUME)
 
         # 跌破下轨 → 做空
         elif last_price < sell_line:
-            target_pos.set_target_volume(-VOLUME)
+            set_target_volume(-VOLUME)
 
     api.close()
 
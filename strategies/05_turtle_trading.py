@@ -53,6 +53,9 @@ TqSdk 是信易科技开源的 Python 量化交易开发包，面向国内期货
 文档：https://doc.shinnytech.com/tqsdk/latest/
 """
 
+from collections import deque
+
+import numpy as np
 import pandas as pd
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
 
@@ -69,10 +72,109 @@ KLINE_DUR = 86400
 
 def calc_atr(klines: pd.DataFrame, period: int) -> pd.Series:
     """计算 ATR（Wilder 平滑）"""
-    high, low, close = klines.high, klines.low, klines.close
-    prev_close = close.shift(1)
-    tr = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
-    return tr.ewm(alpha=1.0 / period, adjust=False).mean()
+    high = klines.high.to_numpy()
+    low = klines.low.to_numpy()
+    close = klines.close.to_numpy()
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    # 三个候选值逐元素取最大，fmax 忽略 NaN（首根 K 线没有昨收，TR 取 high - low）
+    tr = np.fmax.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    # Wilder 平滑：atr[i] = atr[i-1] + alpha × (tr[i] - atr[i-1])，与 ewm(adjust=False) 一致
+    alpha = 1.0 / period
+    atr = np.empty_like(tr)
+    prev = float("nan")
+    for i, v in enumerate(tr.tolist()):
+        if prev != prev:         # 从第一根有数据的 K 线开始递推
+            prev = v
+        elif v == v:
+            prev += alpha * (v - prev)
+        atr[i] = prev
+    return pd.Series(atr, index=klines.index)
+
+class WilderATR:
+    """
+    Wilder ATR 增量计算器。
+
+    先用 calc_atr 在历史 K 线上算出初值，之后每根已完成 K 线只需
+    用它的高/低价与前收算出 TR，再递推一步：atr += alpha × (tr - atr)，
+    不必对整段 K 线重算 TR 与平滑。
+    """
+
+    __slots__ = ("alpha", "atr", "prev_close")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period: int):
+        self.alpha = 1.0 / period
+        self.atr = float("nan")  # 当前 ATR
+        self.prev_close = None   # 最近一根已完成 K 线的收盘价
+
+    def seed(self, atr: float, prev_close: float):
+        """用历史 K 线算出的 ATR 与最后一根 K 线的收盘价建立状态"""
+        self.atr = float(atr)
+        self.prev_close = float(prev_close)
+
+    def push(self, high: float, low: float, close: float):
+        """一根 K 线完成：计算其真实波幅并递推 ATR"""
+        tr = high - low
+        if self.prev_close is not None:
+            pc = self.prev_close
+            tr = max(tr, abs(high - pc), abs(low - pc))
+        if self.atr != self.atr:
+            self.atr = tr
+        else:
+            self.atr += self.alpha * (tr - self.atr)
+        self.prev_close = close
+
+    @property
+    def value(self) -> float:
+        """当前 ATR（尚无数据时为 nan）"""
+        return self.atr
+
+class RollingExtrema:
+    """
+    滑动窗口最高价 / 最低价（单调队列，增量更新）。
+
+    队列按时间顺序保存 (序号, 价格)，且价格单调（求最高时递减，求最低时递增）：
+    新价格入队前先弹出队尾所有被它"压住"的旧价格，再从队首移出已滑出窗口的元素，
+    队首即为窗口极值。每根 K 线均摊 O(1)，不必每次对 N 根 K 线切片求 max/min。
+    """
+
+    __slots__ = ("period", "is_max", "skipna", "_q", "_count", "_last_nan")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period: int, is_max: bool, skipna: bool = True):
+        self.period = period
+        self.is_max = is_max     # True 求最高价，False 求最低价
+        self.skipna = skipna     # True 忽略 NaN（同 pandas max/min），False 窗口含 NaN 即为 nan（同 hhv/llv）
+        self._q = deque()        # (序号, 价格)
+        self._count = 0          # 已计入的 K 线数
+        self._last_nan = -period  # 最近一个 NaN 的序号
+
+    def push(self, price: float):
+        """一根 K 线完成：计入它的价格并移出滑出窗口的旧价格"""
+        q = self._q
+        if price != price:
+            # NaN 与任何值比较都为 False，入队后既弹不出、也压不住旧价格，因此不入队，只记下位置
+            self._last_nan = self._count
+        else:
+            if self.is_max:
+                while q and q[-1][1] <= price:
+                    q.pop()
+            else:
+                while q and q[-1][1] >= price:
+                    q.pop()
+            q.append((self._count, price))
+        self._count += 1
+        while q and q[0][0] < self._count - self.period:
+            q.popleft()
+
+    @property
+    def value(self) -> float:
+        """窗口极值（窗口未填满、全为 NaN，或 skipna=False 且含 NaN 时返回 nan）"""
+        if self._count < self.period or not self._q:
+            return float("nan")
+        if not self.skipna and self._last_nan >= self._count - self.period:
+            return float("nan")
+        return self._q[0][1]
 
 def calc_volume(account, atr_val: float) -> int:
     """ATR 仓位管理：根据账户净值和波动率计算建议手数"""
@@ -89,47 +191,71 @@ def main():
     # TargetPosTask：声明目标仓位，自动处理下单细节
     target_pos = TargetPosTask(api, SYMBOL)
 
+    last_bar_id = None   # 上次计入通道的已完成 K 线 id
+    last_target = None   # 最近一次设置的目标仓位
+
     print(f"[海龟策略] 启动 | {SYMBOL} | 入场N1={N1} | 出场N2={N2}")
 
     while True:
         api.wait_update()
-        if not api.is_changing(klines):
-            continue
-
-        atr_val = calc_atr(klines, ATR_PERIOD).iloc[-1]
-        if pd.isna(atr_val) or atr_val <= 0:
+        # 仅在新 K 线出现（上一根 K 线刚完成）时计算，形成中 K 线的逐笔变动直接跳过
+        if not api.is_changing(klines.iloc[-1], "datetime"):
             continue
 
         # 使用已完成K线计算通道（-2为最新完成K线，避免用未完成的）
-        high_n1 = klines.high.iloc[-(N1 + 1):-1].max()
-        low_n1  = klines.low.iloc[-(N1 + 1):-1].min()
-        high_n2 = klines.high.iloc[-(N2 + 1):-1].max()
-        low_n2  = klines.low.iloc[-(N2 + 1):-1].min()
+        bar_id = klines.id.iloc[-2]
+        if last_bar_id is None or bar_id != last_bar_id + 1:
+            # 首次运行（或中间漏掉了 K 线）：用之前的已完成 K 线重建四条通道的窗口
+            hi_n1, lo_n1 = RollingExtrema(N1, is_max=True), RollingExtrema(N1, is_max=False)
+            hi_n2, lo_n2 = RollingExtrema(N2, is_max=True), RollingExtrema(N2, is_max=False)
+            hist_high = klines.high.iloc[-(max(N1, N2) + 1):-2].tolist()
+            hist_low = klines.low.iloc[-(max(N1, N2) + 1):-2].tolist()
+            for h, l in zip(hist_high, hist_low):
+                hi_n1.push(h)
+                lo_n1.push(l)
+                hi_n2.push(h)
+                lo_n2.push(l)
+            # ATR 初值：在刚完成 K 线之前的历史上整段计算一次
+            history = klines.iloc[:-2]
+            atr_calc = WilderATR(ATR_PERIOD)
+            atr_calc.seed(calc_atr(history, ATR_PERIOD).iloc[-1], history.close.iloc[-1])
+        # 把刚完成的 K 线计入通道与 ATR
+        last_high, last_low = klines.high.iloc[-2], klines.low.iloc[-2]
         last_close = klines.close.iloc[-2]
+        hi_n1.push(last_high)
+        lo_n1.push(last_low)
+        hi_n2.push(last_high)
+        lo_n2.push(last_low)
+        atr_calc.push(last_high, last_low, last_close)
+        last_bar_id = bar_id
+
+        atr_val = atr_calc.value
+        if atr_val != atr_val or atr_val <= 0:   # NaN（数据不足）或无波动时跳过
+            continue
+
+        high_n1, low_n1 = hi_n1.value, lo_n1.value
+        high_n2, low_n2 = hi_n2.value, lo_n2.value
 
         vol = calc_volume(account, atr_val)
 
         print(f"收盘:{last_close:.2f} ATR:{atr_val:.2f} N1:[{low_n1:.2f},{high_n1:.2f}] N2:[{low_n2:.2f},{high_n2:.2f}] 建议:{vol}手")
 
         if last_close > high_n1:
-            # 突破 N1 日新高 → 做多
-            print(f">>> 突破{N1}日新高，做多{vol}手")
-            target_pos.set_target_volume(vol)
-
+            target, reason = vol, f"突破{N1}日新高，做多{vol}手"    # 突破 N1 日新高 → 做多
         elif last_close < low_n1:
-            # 跌破 N1 日新低 → 做空
-            print(f">>> 跌破{N1}日新低，做空{vol}手")
-            target_pos.set_target_volume(-vol)
-
+            target, reason = -vol, f"跌破{N1}日新低，做空{vol}手"   # 跌破 N1 日新低 → 做空
         elif last_close < low_n2:
-            # 多头：跌破 N2 日新低 → 出场
-            print(f">>> 跌破{N2}日新低，平多")
-            target_pos.set_target_volume(0)
-
+            target, reason = 0, f"跌破{N2}日新低，平多"             # 多头：跌破 N2 日新低 → 出场
         elif last_close > high_n2:
-            # 空头：突破 N2 日新高 → 出场
-            print(f">>> 突破{N2}日新高，平空")
-            target_pos.set_target_volume(0)
+            target, reason = 0, f"突破{N2}日新高，平空"             # 空头：突破 N2 日新高 → 出场
+        else:
+            continue
+
+        # 目标仓位与上次相同时不再重复下达和打印
+        if target != last_target:
+            print(f">>> {reason}")
+            target_pos.set_target_volume(target)
+            last_target = target
 
     api.close()
 
@@ -60,7 +60,7 @@ MACD（Moving Average Convergence Divergence）由 Gerald Appel 于1970年代末
 """
 
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import ema, crossup, crossdown
+from tqsdk.tafunc import ema
 
 # ===================== 策略参数 =====================
 SYMBOL = "SHFE.cu2506"
@@ -72,6 +72,44 @@ KLINE_DURATION = 3600
 DATA_LENGTH = 300
 # ===================================================
 
+class MacdState:
+    """
+    MACD 增量计算器。
+
+    首次运行时用 tafunc.ema 在历史 K 线上算出三条 EMA 的初值，
+    之后每根已完成 K 线只按 ema += alpha × (x - ema) 递推一步，
+    不必对整段 K 线重跑 ema()。
+    """
+
+    __slots__ = ("fast", "slow", "signal", "a_fast", "a_slow", "a_signal",
+                 "ema_fast", "ema_slow", "dif", "dea")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, fast: int, slow: int, signal: int):
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.a_fast = 2.0 / (fast + 1)
+        self.a_slow = 2.0 / (slow + 1)
+        self.a_signal = 2.0 / (signal + 1)
+        self.ema_fast = self.ema_slow = float("nan")
+        self.dif = float("nan")  # DIF：差离值
+        self.dea = float("nan")  # DEA：信号线
+
+    def seed(self, close):
+        """用历史收盘价（Series）一次性算出三条 EMA 的当前值"""
+        ema_fast = ema(close, self.fast)
+        ema_slow = ema(close, self.slow)
+        dif = ema_fast - ema_slow
+        self.ema_fast = float(ema_fast.iloc[-1])
+        self.ema_slow = float(ema_slow.iloc[-1])
+        self.dif = float(dif.iloc[-1])
+        self.dea = float(ema(dif, self.signal).iloc[-1])
+
+    def push(self, price: float):
+        """一根 K 线完成：递推快慢线、DIF 与 DEA"""
+        self.ema_fast += self.a_fast * (price - self.ema_fast)
+        self.ema_slow += self.a_slow * (price - self.ema_slow)
+        self.dif = self.ema_fast - self.ema_slow
+        self.dea += self.a_signal * (self.dif - self.dea)
+
 def main():
     api = TqApi(account=TqSim(), auth=TqAuth("YOUR_ACCOUNT", "YOUR_PASSWORD"))
     klines = api.get_kline_serial(SYMBOL, KLINE_DURATION, data_length=DATA_LENGTH)
@@ -79,28 +117,35 @@ def main():
     # TargetPosTask：声明目标仓位，自动追单直到达到目标
     target_pos = TargetPosTask(api, SYMBOL)
 
+    last_bar_id = None   # 上次计入 MACD 状态的已完成 K 线 id
+
     print(f"[MACD策略] 启动 | {SYMBOL} | 快线:{FAST_PERIOD} 慢线:{SLOW_PERIOD} 信号:{SIGNAL_PERIOD}")
 
     try:
         while True:
             api.wait_update()
-            if not api.is_changing(klines):
+            # 仅在新 K 线出现（上一根 K 线刚完成）时计算，形成中 K 线的逐笔变动直接跳过
+            if not api.is_changing(klines.iloc[-1], "datetime"):
                 continue
 
+            bar_id = klines.id.iloc[-2]       # 刚完成的 K 线
             close = klines["close"]
-
-            # 计算 MACD 三线
-            ema_fast = ema(close, FAST_PERIOD)
-            ema_slow = ema(close, SLOW_PERIOD)
-            dif = ema_fast - ema_slow          # DIF：差离值
-            dea = ema(dif, SIGNAL_PERIOD)      # DEA：信号线
+            if last_bar_id is None or bar_id != last_bar_id + 1:
+                # 首次运行（或中间漏掉了 K 线）：用之前的已完成 K 线重建 EMA 状态
+                macd = MacdState(FAST_PERIOD, SLOW_PERIOD, SIGNAL_PERIOD)
+                macd.seed(close.iloc[:-2])
+            prev_dif, prev_dea = macd.dif, macd.dea
+
+            # 使用已完成K线（-2）递推 MACD 三线，避免用未完成K线产生假信号
+            macd.push(close.iloc[-2])
+            last_bar_id = bar_id
+            dif, dea = macd.dif, macd.dea
             macd_bar = (dif - dea) * 2         # MACD柱
 
-            # 使用已完成K线（-2）判断金叉/死叉，避免用未完成K线产生假信号
-            is_golden = bool(crossup(dif, dea).iloc[-2])    # DIF上穿DEA：金叉
-            is_death  = bool(crossdown(dif, dea).iloc[-2])  # DIF下穿DEA：死叉
+            is_golden = prev_dif <= prev_dea and dif > dea   # DIF上穿DEA：金叉
+            is_death  = prev_dif >= prev_dea and dif < dea   # DIF下穿DEA：死叉
 
-            print(f"DIF={dif.iloc[-2]:.4f} DEA={dea.iloc[-2]:.4f} BAR={macd_bar.iloc[-2]:.4f} | 金叉={is_golden} 死叉={is_death}")
+            print(f"DIF={dif:.4f} DEA={dea:.4f} BAR={macd_bar:.4f} | 金叉={is_golden} 死叉={is_death}")
 
             if is_golden:
                 # 金叉 → 目标仓位设为多头 VOLUME 手
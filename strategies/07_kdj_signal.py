@@ -90,12 +90,14 @@ J       = 3 × K - 2 × D
 - OVERSELL：超卖阈值，默认20（K、D值低于此值视为超卖）
 - VOLUME：每次交易手数，默认1
 - KLINE_DURATION：K线周期（秒），默认1800（30分钟）
+- DEBUG：是否打印每次计算的指标状态（调试用），默认False
 ================================================================================
 """
 
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
 from tqsdk.tafunc import hhv, llv, ma
 import numpy as np
+import pandas as pd
 
 # ============================================================
 # 策略参数配置
@@ -109,6 +111,7 @@ OVERSELL = 20                    # 超卖阈值：K/D低于此值为超卖区
 VOLUME = 1                       # 每次交易手数
 KLINE_DURATION = 1800            # K线周期：1800秒 = 30分钟
 DATA_LENGTH = 300                # 获取K线数量
+DEBUG = False                    # 是否打印每次计算的指标状态（调试用）
 
 # ============================================================
 # 初始化 TqApi，使用模拟账户
@@ -128,6 +131,20 @@ print(f"[KDJ策略] 启动成功，交易品种：{SYMBOL}，K线周期：{KLINE
 print(f"[KDJ策略] 参数：N={KDJ_N}，超买={OVERBUY}，超卖={OVERSELL}")
 
 
+def kdj_smooth(values, weight, init=50.0):
+    """
+    KDJ 的指数平滑：Y_n = (1 - weight) * Y_{n-1} + weight * X_n，Y 的初始值为 init
+
+    这正是 pandas ewm(alpha=weight, adjust=False) 的递推式：在序列前补上初始值后
+    交给 ewm 一次算完（C 实现），不再用 Python 逐根循环。
+    ignore_na=True 使 NaN（数据不足）处不参与递推，输出中这些位置仍为 NaN。
+    """
+    padded = pd.Series(np.concatenate(([init], values)))
+    out = padded.ewm(alpha=weight, adjust=False, ignore_na=True).mean().to_numpy()[1:]
+    out[np.isnan(values)] = np.nan
+    return out
+
+
 def calc_kdj(klines, n=9, m1=3, m2=3):
     """
     手动计算KDJ指标
@@ -152,41 +169,20 @@ def calc_kdj(klines, n=9, m1=3, m2=3):
     hh = hhv(high, n)   # N周期最高价（rolling max）
     ll = llv(low, n)    # N周期最低价（rolling min）
 
-    # 计算RSV（原始随机值），避免除以零
-    denominator = hh - ll
-    denominator = denominator.replace(0, 1)  # 分母为0时替换为1，防止除零错误
-    rsv = (close - ll) / denominator * 100   # RSV值在0-100之间
+    # 计算RSV（原始随机值），避免除以零；直接在 ndarray 上运算，不再复制整列 Series
+    ll_arr = ll.to_numpy()
+    span = hh.to_numpy() - ll_arr
+    span = np.where(span == 0, 1.0, span)                # 分母为0时替换为1，防止除零错误
+    rsv = (close.to_numpy() - ll_arr) / span * 100       # RSV值在0-100之间
 
-    # 使用指数平滑迭代计算K值
+    # 使用指数平滑迭代计算K值与D值
     # K_n = (1 - 1/m1) * K_{n-1} + (1/m1) * RSV_n
     # 等价于：K_n = K_{n-1} * (2/3) + RSV_n * (1/3)（当m1=3时）
-    k_values = []
-    k_prev = 50.0  # K值初始值设为50（中性值）
-    
-    for rsv_val in rsv:
-        if np.isnan(rsv_val):
-            k_values.append(np.nan)
-        else:
-            k_cur = k_prev * (1 - 1.0/m1) + rsv_val * (1.0/m1)
-            k_values.append(k_cur)
-            k_prev = k_cur
-
-    import pandas as pd
-    k_series = pd.Series(k_values, index=close.index)
-
-    # 使用指数平滑迭代计算D值
     # D_n = (1 - 1/m2) * D_{n-1} + (1/m2) * K_n
-    d_values = []
-    d_prev = 50.0  # D值初始值设为50
-    
-    for k_val in k_series:
-        if np.isnan(k_val):
-            d_values.append(np.nan)
-        else:
-            d_cur = d_prev * (1 - 1.0/m2) + k_val * (1.0/m2)
-            d_values.append(d_cur)
-            d_prev = d_cur
+    k_values = kdj_smooth(rsv, 1.0 / m1)        # K值初始值设为50（中性值）
+    d_values = kdj_smooth(k_values, 1.0 / m2)   # D值初始值设为50
 
+    k_series = pd.Series(k_values, index=close.index)
     d_series = pd.Series(d_values, index=close.index)
 
     # J线 = 3 * K - 2 * D（J线波动幅度大于K、D，超前性强）
@@ -205,8 +201,8 @@ try:
     while True:
         api.wait_update()  # 阻塞等待行情更新
 
-        # 仅在K线数据更新时处理
-        if api.is_changing(klines):
+        # 仅在新K线出现（上一根K线刚完成）时处理，形成中K线的逐笔变动直接跳过
+        if api.is_changing(klines.iloc[-1], "datetime"):
 
             # ---- 计算KDJ指标 ----
             k, d, j = calc_kdj(klines, n=KDJ_N, m1=KDJ_M1, m2=KDJ_M2)
@@ -219,10 +215,11 @@ try:
             d_prev = d.iloc[-3]    # 前一D值
 
             # 打印指标状态（调试用）
-            print(
-                f"[{klines['datetime'].iloc[-2]}] "
-                f"K={k_cur:.2f}, D={d_cur:.2f}, J={j_cur:.2f}"
-            )
+            if DEBUG:
+                print(
+                    f"[{klines['datetime'].iloc[-2]}] "
+                    f"K={k_cur:.2f}, D={d_cur:.2f}, J={j_cur:.2f}"
+                )
 
             # ---- 检测金叉/死叉信号 ----
             # 金叉：前一K < 前一D，当前K > 当前D（K线从下穿越D线）
@@ -96,13 +96,13 @@ CCI值：
 - VOLUME：每次交易手数，默认1
 - KLINE_DURATION：K线周期（秒），默认3600（1小时）
 - DATA_LENGTH：K线数量，默认200
+- DEBUG：是否打印每次计算的指标状态（调试用），默认False
 ================================================================================
 """
 
+from collections import deque
+
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import ma
-import pandas as pd
-import numpy as np
 
 # ============================================================
 # 策略参数配置
@@ -114,6 +114,7 @@ LEVEL2 = 200                     # 二级阈值：极度超买/超卖，顺势
 VOLUME = 1                       # 每次交易手数
 KLINE_DURATION = 3600            # K线周期：3600秒 = 1小时
 DATA_LENGTH = 200                # 获取K线数量（需大于CCI_N）
+DEBUG = False                    # 是否打印每次计算的指标状态（调试用）
 
 # ============================================================
 # 初始化 TqApi
@@ -133,9 +134,9 @@ print(f"[CCI策略] 启动成功，交易品种：{SYMBOL}，K线周期：{KLINE
 print(f"[CCI策略] 参数：N={CCI_N}，一级阈值=±{LEVEL1}，二级阈值=±{LEVEL2}")
 
 
-def calc_cci(klines, n=14):
+class CciStream:
     """
-    计算CCI（商品通道指数）
+    CCI（商品通道指数）增量计算器
 
     计算步骤：
     1. 典型价格 TP = (High + Low + Close) / 3
@@ -143,36 +144,38 @@ def calc_cci(klines, n=14):
     3. N期平均偏差 MD = mean(|TP - TP_MA|)
     4. CCI = (TP - TP_MA) / (0.015 × MD)
 
-    参数：
-        klines: K线数据DataFrame
-        n: CCI计算周期
-
-    返回：
-        CCI指标 pandas Series
+    只保存最近 N 根已完成K线的 TP 及其和：每根新K线 O(1) 更新均线，
+    平均偏差只需遍历窗口内 N 个值，不必每次对整段K线重算 TP/均线/偏差。
     """
-    high = klines["high"]    # 最高价
-    low = klines["low"]      # 最低价
-    close = klines["close"]  # 收盘价
-
-    # 第一步：计算典型价格（Typical Price）
-    tp = (high + low + close) / 3.0
-
-    # 第二步：计算TP的N期简单移动均线
-    tp_ma = ma(tp, n)
-
-    # 第三步：计算N期平均偏差（Mean Deviation）
-    # 使用rolling计算每个窗口内 |TP - TP_MA| 的均值
-    md = tp.rolling(window=n).apply(
-        lambda x: np.mean(np.abs(x - x.mean())),
-        raw=True
-    )
-
-    # 第四步：计算CCI值，0.015是Lambert定义的常数
-    # 避免除以零（当md为0时，价格没有波动，CCI设为0）
-    cci = (tp - tp_ma) / (0.015 * md.replace(0, np.nan))
-    cci = cci.fillna(0)  # 将NaN填充为0
 
-    return cci
+    __slots__ = ("n", "_buf", "_sum")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, n=14):
+        self.n = n
+        self._buf = deque(maxlen=n)   # 窗口内的典型价格
+        self._sum = 0.0               # 窗口内典型价格之和
+
+    def push(self, high, low, close):
+        """一根K线完成：计入它的典型价格，移出窗口最旧的值"""
+        tp = (high + low + close) / 3.0
+        if tp != tp:                  # 跳过无数据的K线（NaN）
+            return
+        if len(self._buf) == self.n:
+            self._sum -= self._buf[0]
+        self._buf.append(tp)
+        self._sum += tp
+
+    @property
+    def value(self):
+        """当前CCI值；数据不足或平均偏差为0（价格没有波动）时为0"""
+        if len(self._buf) < self.n:
+            return 0.0
+        tp_ma = self._sum / self.n
+        md = sum(abs(x - tp_ma) for x in self._buf) / self.n
+        if md == 0:
+            return 0.0
+        # 0.015是Lambert定义的常数
+        return (self._buf[-1] - tp_ma) / (0.015 * md)
 
 
 # ============================================================
@@ -182,23 +185,39 @@ try:
     # TargetPosTask：只需声明目标仓位，自动处理追单/撤单/部分成交
     target_pos = TargetPosTask(api, SYMBOL)
 
+    # 持仓对象由 TqSdk 随行情自动更新，循环外取一次即可
+    position = api.get_position(SYMBOL)
+
+    cci_calc = CciStream(CCI_N)
+    last_bar_id = None   # 上次计入CCI的已完成K线 id
+
     while True:
         api.wait_update()  # 等待行情更新
 
-        if api.is_changing(klines):
+        # 仅在新K线出现（上一根K线刚完成）时计算，形成中K线的逐笔变动直接跳过
+        if api.is_changing(klines.iloc[-1], "datetime"):
 
-            # ---- 计算CCI指标 ----
-            cci = calc_cci(klines, n=CCI_N)
+            # ---- 增量更新CCI指标 ----
+            bar_id = klines.id.iloc[-2]   # 刚完成的K线
+            if last_bar_id is None or bar_id != last_bar_id + 1:
+                # 首次运行（或中间漏掉了K线）：用之前的已完成K线重建TP窗口
+                cci_calc = CciStream(CCI_N)
+                hist = klines.iloc[-(CCI_N + 2):-2]
+                for h, l, c in zip(hist.high.tolist(), hist.low.tolist(), hist.close.tolist()):
+                    cci_calc.push(h, l, c)
 
             # 取最近两根完成K线的CCI值（-2为当前完成K，-3为前一完成K）
-            cci_cur = cci.iloc[-2]   # 当前CCI值
-            cci_prev = cci.iloc[-3]  # 前一CCI值（用于判断穿越方向）
+            cci_prev = cci_calc.value  # 前一CCI值（用于判断穿越方向）
+            cci_calc.push(klines.high.iloc[-2], klines.low.iloc[-2], klines.close.iloc[-2])
+            last_bar_id = bar_id
+            cci_cur = cci_calc.value   # 当前CCI值
 
             # 打印指标状态
-            print(
-                f"[{klines['datetime'].iloc[-2]}] "
-                f"CCI={cci_cur:.2f}（前值={cci_prev:.2f}）"
-            )
+            if DEBUG:
+                print(
+                    f"[{klines['datetime'].iloc[-2]}] "
+                    f"CCI={cci_cur:.2f}（前值={cci_prev:.2f}）"
+                )
 
             # ---- 信号判断 ----
             # 【顺势突破+200】CCI从下方突破+200，极强多头动能，做多
@@ -212,47 +231,32 @@ try:
             short_exit = (cci_prev <= -LEVEL1) and (cci_cur > -LEVEL1)
 
             # ---- 查询当前持仓 ----
-            position = api.get_position(SYMBOL)
             volume_long = position.volume_long
             volume_short = position.volume_short
 
-            # ---- 执行平仓逻辑（优先平仓）----
+            # ---- 确定目标仓位（先判断平仓，出现开仓信号时以开仓为准）----
+            # 反手时直接把目标设为反向仓位，TargetPosTask 会自动先平后开，只需下达一次
+            target, reason = None, ""
 
             # CCI回落到+100以下，多仓止盈平仓
             if long_exit and volume_long > 0:
-                target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
-                print(f"[CCI策略] CCI回落平多：CCI={cci_cur:.2f}，平多{volume_long}手")
+                target, reason = 0, f"CCI回落平多：CCI={cci_cur:.2f}，平多{volume_long}手"
 
             # CCI回升到-100以上，空仓止盈平仓
             if short_exit and volume_short > 0:
-                target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
-                print(f"[CCI策略] CCI回升平空：CCI={cci_cur:.2f}，平空{volume_short}手")
-
-            # ---- 执行开仓逻辑 ----
-
-            # 【极强多头动能】CCI突破+200，顺势开多
-            if cross_up_200:
-                # 先平空仓（如有）
-                if volume_short > 0:
-                    target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
-                    print(f"[CCI策略] CCI突破+{LEVEL2}，先平空：{volume_short}手")
-
-                # 开多仓
-                if volume_long == 0:
-                    target_pos.set_target_volume(VOLUME)   # 做多：TargetPosTask自动追单到目标仓位
-                    print(f"[CCI策略] CCI突破+{LEVEL2}开多：CCI={cci_cur:.2f}，开多{VOLUME}手")
-
-            # 【极强空头动能】CCI跌破-200，顺势开空
-            if cross_down_200:
-                # 先平多仓（如有）
-                if volume_long > 0:
-                    target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
-                    print(f"[CCI策略] CCI跌破-{LEVEL2}，先平多：{volume_long}手")
-
-                # 开空仓
-                if volume_short == 0:
-                    target_pos.set_target_volume(-VOLUME)  # 做空：TargetPosTask自动追单到目标仓位
-                    print(f"[CCI策略] CCI跌破-{LEVEL2}开空：CCI={cci_cur:.2f}，开空{VOLUME}手")
+                target, reason = 0, f"CCI回升平空：CCI={cci_cur:.2f}，平空{volume_short}手"
+
+            # 【极强多头动能】CCI突破+200，顺势开多（有空仓则反手）
+            if cross_up_200 and volume_long == 0:
+                target, reason = VOLUME, f"CCI突破+{LEVEL2}开多：CCI={cci_cur:.2f}，开多{VOLUME}手"
+
+            # 【极强空头动能】CCI跌破-200，顺势开空（有多仓则反手）
+            if cross_down_200 and volume_short == 0:
+                target, reason = -VOLUME, f"CCI跌破-{LEVEL2}开空：CCI={cci_cur:.2f}，开空{VOLUME}手"
+
+            if target is not None:
+                target_pos.set_target_volume(target)   # TargetPosTask自动追单到目标仓位
+                print(f"[CCI策略] {reason}")
 
 except KeyboardInterrupt:
     print("[CCI策略] 用户中断，策略停止运行")
@@ -101,11 +101,12 @@ ATR倍数参考：日线行情建议ATR×2-3，分钟线建议ATR×1.5-2.5
 - ATR_MULTIPLIER：ATR倍数（止损距离 = ATR × 倍数），默认2.0
 - VOLUME：每次交易手数，默认1
 - KLINE_DURATION：K线周期（秒），默认3600（1小时）
+- DEBUG：是否打印每次计算的指标状态（调试用），默认False
 ================================================================================
 """
 
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import ma, ema, crossup, crossdown
+from tqsdk.tafunc import ema
 import pandas as pd
 import numpy as np
 
@@ -120,6 +121,7 @@ ATR_MULTIPLIER = 2.0             # ATR倍数（止损距离 = ATR × 该倍数
 VOLUME = 1                       # 每次交易手数
 KLINE_DURATION = 3600            # K线周期：3600秒 = 1小时
 DATA_LENGTH = 300                # 获取K线数量
+DEBUG = False                    # 是否打印每次计算的指标状态（调试用）
 
 # ============================================================
 # 初始化 TqApi
@@ -139,11 +141,11 @@ print(f"[ATR止损策略] 启动成功，交易品种：{SYMBOL}")
 print(f"[ATR止损策略] 参数：MA快线={MA_FAST}，MA慢线={MA_SLOW}，ATR周期={ATR_N}，ATR倍数={ATR_MULTIPLIER}")
 
 # 追踪止损线状态（程序运行期间保持状态）
-long_stop_price = 0.0    # 当前多仓追踪止损价格（只增不减）
-short_stop_price = float('inf')  # 当前空仓追踪止损价格（只减不增）
+long_stop_price = None   # 当前多仓追踪止损价格（只增不减），None 表示未设置
+short_stop_price = None  # 当前空仓追踪止损价格（只减不增），None 表示未设置
 
 
-def calc_atr(klines, n=14):
+def calc_atr(high, low, close, n=14):
     """
     计算ATR（平均真实波幅）
 
@@ -151,29 +153,29 @@ def calc_atr(klines, n=14):
     ATR = EMA(TR, N)
 
     参数：
-        klines: K线数据DataFrame
+        high, low, close: 最高价、最低价、收盘价数组（ndarray）
         n: ATR计算周期
 
     返回：
-        ATR pandas Series
+        ATR 数组（ndarray），与输入等长
     """
-    high = klines["high"]
-    low = klines["low"]
-    close = klines["close"]
+    # 直接在 ndarray 上计算，避免 shift / abs / concat 逐步生成 Series 和 DataFrame
 
-    # 计算前一收盘价（shift(1)向后移动1位）
-    prev_close = close.shift(1)
+    # 计算前一收盘价（整体后移1位，首根K线没有前收盘价记为NaN）
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
 
     # 真实波幅TR = max(当前高低价差, 当前高与前收盘差, 当前低与前收盘差)
     tr1 = high - low                          # 当日高低价差
-    tr2 = (high - prev_close).abs()           # 当日最高与前收盘差的绝对值
-    tr3 = (low - prev_close).abs()            # 当日最低与前收盘差的绝对值
+    tr2 = np.abs(high - prev_close)           # 当日最高与前收盘差的绝对值
+    tr3 = np.abs(low - prev_close)            # 当日最低与前收盘差的绝对值
 
-    # 取三者最大值作为TR
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+    # 逐元素取三者最大值作为TR（fmax 忽略 NaN，首根K线的TR即为高低价差）
+    tr = np.fmax(np.fmax(tr1, tr2), tr3)
 
-    # 用EMA平滑TR得到ATR
-    atr = ema(tr, n)
+    # 用EMA平滑TR得到ATR（tafunc.ema 需要 Series 输入）
+    atr = ema(pd.Series(tr), n).to_numpy()
 
     return atr
 
@@ -185,50 +187,56 @@ try:
     # TargetPosTask：只需声明目标仓位，自动处理追单/撤单/部分成交
     target_pos = TargetPosTask(api, SYMBOL)
 
+    # 持仓对象由 TqSdk 随行情自动更新，循环外取一次即可
+    position = api.get_position(SYMBOL)
+
     while True:
         api.wait_update()  # 等待数据更新
-        position = api.get_position(SYMBOL)
 
         # ---- 实时止损检查（每次行情更新都检查，不只在K线完成时）----
-        if api.is_changing(quote):
+        # 没有已设置的止损线（空仓）时直接跳过，不必逐笔查看持仓
+        has_stop = long_stop_price is not None or short_stop_price is not None
+        if has_stop and api.is_changing(quote):
             current_price = quote.last_price  # 当前最新成交价
 
             # 检查多仓止损（价格跌破追踪止损线）
-            if position.volume_long > 0 and long_stop_price > 0:
+            if long_stop_price is not None and position.volume_long > 0:
                 if current_price < long_stop_price:
                     triggered_stop_price = long_stop_price
                     target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
-                    long_stop_price = 0.0  # 重置止损价
+                    long_stop_price = None  # 重置止损价
                     print(f"[ATR止损策略] 多仓止损触发：价格={current_price:.2f}，止损线={triggered_stop_price:.2f}")
 
             # 检查空仓止损（价格涨破追踪止损线）
-            if position.volume_short > 0 and short_stop_price < float('inf'):
+            if short_stop_price is not None and position.volume_short > 0:
                 if current_price > short_stop_price:
                     triggered_stop_price = short_stop_price
                     target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
-                    short_stop_price = float('inf')  # 重置止损价
+                    short_stop_price = None  # 重置止损价
                     print(f"[ATR止损策略] 空仓止损触发：价格={current_price:.2f}，止损线={triggered_stop_price:.2f}")
 
-        # ---- K线更新：计算指标并更新追踪止损线 ----
-        if api.is_changing(klines):
+        # ---- K线完成：计算指标并更新追踪止损线 ----
+        # 仅在新K线出现（上一根K线刚完成）时计算，形成中K线的逐笔变动直接跳过
+        if api.is_changing(klines.iloc[-1], "datetime"):
 
-            # 计算均线
-            close = klines["close"]
-            ma_fast = ma(close, MA_FAST)    # 快速均线
-            ma_slow = ma(close, MA_SLOW)    # 慢速均线
+            # 收盘价取一次 ndarray，均线只在需要的两根完成K线（-3、-2）处对窗口求均值，
+            # 不再对整列计算 ma() 再取其中两个值
+            close = klines["close"].to_numpy()
+            ma_fast_cur = close[-(MA_FAST + 1):-1].mean()    # 快速均线
+            ma_slow_cur = close[-(MA_SLOW + 1):-1].mean()    # 慢速均线
+            ma_fast_prev = close[-(MA_FAST + 2):-2].mean()
+            ma_slow_prev = close[-(MA_SLOW + 2):-2].mean()
 
             # 计算ATR
-            atr = calc_atr(klines, n=ATR_N)
+            atr = calc_atr(klines["high"].to_numpy(), klines["low"].to_numpy(), close, n=ATR_N)
 
             # 取最新完成K线的数据（-2为最近完成K线）
-            close_cur = close.iloc[-2]
-            atr_cur = atr.iloc[-2]
-            ma_fast_cur = ma_fast.iloc[-2]
-            ma_slow_cur = ma_slow.iloc[-2]
+            close_cur = close[-2]
+            atr_cur = atr[-2]
 
-            # 检测均线金叉/死叉
-            is_golden = bool(crossup(ma_fast, ma_slow).iloc[-2])   # 金叉：快线上穿慢线
-            is_death = bool(crossdown(ma_fast, ma_slow).iloc[-2])  # 死叉：快线下穿慢线
+            # 检测均线金叉/死叉：比较最近两根完成K线的快慢线
+            is_golden = ma_fast_prev <= ma_slow_prev and ma_fast_cur > ma_slow_cur   # 金叉：快线上穿慢线
+            is_death = ma_fast_prev >= ma_slow_prev and ma_fast_cur < ma_slow_cur    # 死叉：快线下穿慢线
 
             # 计算当前ATR止损距离
             atr_stop_dist = ATR_MULTIPLIER * atr_cur  # 止损距离 = ATR倍数 × ATR值
@@ -239,28 +247,31 @@ try:
                 # 多仓追踪止损线 = 收盘价 - ATR止损距离
                 new_long_stop = close_cur - atr_stop_dist
                 # 止损线只能上移（保护已有利润），取当前计算值与历史止损线的较大值
-                long_stop_price = max(long_stop_price, new_long_stop)
-                print(
-                    f"[ATR止损策略] 多仓止损线更新：{long_stop_price:.2f}"
-                    f"（ATR={atr_cur:.2f}，距离={atr_stop_dist:.2f}）"
-                )
+                long_stop_price = new_long_stop if long_stop_price is None else max(long_stop_price, new_long_stop)
+                if DEBUG:
+                    print(
+                        f"[ATR止损策略] 多仓止损线更新：{long_stop_price:.2f}"
+                        f"（ATR={atr_cur:.2f}，距离={atr_stop_dist:.2f}）"
+                    )
 
             if position.volume_short > 0:
                 # 空仓追踪止损线 = 收盘价 + ATR止损距离
                 new_short_stop = close_cur + atr_stop_dist
                 # 止损线只能下移，取当前计算值与历史止损线的较小值
-                short_stop_price = min(short_stop_price, new_short_stop)
+                short_stop_price = new_short_stop if short_stop_price is None else min(short_stop_price, new_short_stop)
+                if DEBUG:
+                    print(
+                        f"[ATR止损策略] 空仓止损线更新：{short_stop_price:.2f}"
+                        f"（ATR={atr_cur:.2f}，距离={atr_stop_dist:.2f}）"
+                    )
+
+            if DEBUG:
                 print(
-                    f"[ATR止损策略] 空仓止损线更新：{short_stop_price:.2f}"
-                    f"（ATR={atr_cur:.2f}，距离={atr_stop_dist:.2f}）"
+                    f"[{klines['datetime'].iloc[-2]}] "
+                    f"MA快={ma_fast_cur:.2f}，MA慢={ma_slow_cur:.2f}，"
+                    f"ATR={atr_cur:.2f}，金叉={is_golden}，死叉={is_death}"
                 )
 
-            print(
-                f"[{klines['datetime'].iloc[-2]}] "
-                f"MA快={ma_fast_cur:.2f}，MA慢={ma_slow_cur:.2f}，"
-                f"ATR={atr_cur:.2f}，金叉={is_golden}，死叉={is_death}"
-            )
-
             # ---- 开仓逻辑 ----
 
             # 【金叉开多】快线上穿慢线，趋势转多，开多仓
@@ -268,7 +279,7 @@ try:
                 if position.volume_short > 0:
                     # 先平空仓（反手）
                     target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
-                    short_stop_price = float('inf')  # 重置空仓止损价
+                    short_stop_price = None  # 重置空仓止损价
                     print(f"[ATR止损策略] 金叉平空：{position.volume_short}手")
 
                 if position.volume_long == 0:
@@ -282,7 +293,7 @@ try:
                 if position.volume_long > 0:
                     # 先平多仓（反手）
                     target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
-                    long_stop_price = 0.0  # 重置多仓止损价
+                    long_stop_price = None  # 重置多仓止损价
                     print(f"[ATR止损策略] 死叉平多：{position.volume_long}手")
 
                 if position.volume_short == 0:
@@ -100,11 +100,11 @@ TqSdk 是信易科技开源的 Python 量化交易开发包，面向国内期货
 - USE_MA_FILTER：是否启用均线过滤，默认True
 - VOLUME：每次交易手数，默认1
 - KLINE_DURATION：K线周期（秒），默认3600（1小时）
+- DEBUG：是否打印每次计算的指标状态（调试用），默认False
 ================================================================================
 """
 
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import ma
 
 # ============================================================
 # 策略参数配置
@@ -118,6 +118,7 @@ USE_MA_FILTER = True             # 是否启用均线过滤（True=开启）
 VOLUME = 1                       # 每次交易手数
 KLINE_DURATION = 3600            # K线周期：1小时
 DATA_LENGTH = 300                # K线数量（需 > MOMENTUM_N + FILTER_N）
+DEBUG = False                    # 是否打印每次计算的指标状态（调试用）
 
 # ============================================================
 # 初始化 TqApi
@@ -147,15 +148,16 @@ try:
     while True:
         api.wait_update()  # 等待行情更新
 
-        if api.is_changing(klines):
+        # 仅在新K线出现（上一根K线刚完成）时计算，形成中K线的逐笔变动直接跳过
+        if api.is_changing(klines.iloc[-1], "datetime"):
 
-            close = klines["close"]  # 收盘价序列
+            close = klines["close"].to_numpy()  # 收盘价数组（只用到其中几个值，不必计算整列指标）
 
             # ---- 计算价格动量 ----
             # 取最近完成K线（-2）和N根前的K线（-2-MOMENTUM_N）
             # 动量 = (当前价 - N根前价) / N根前价 × 100%
-            close_cur = close.iloc[-2]                    # 当前收盘价
-            close_n_ago = close.iloc[-2 - MOMENTUM_N]    # N根K线前的收盘价
+            close_cur = close[-2]                    # 当前收盘价
+            close_n_ago = close[-2 - MOMENTUM_N]    # N根K线前的收盘价
 
             # 防止除以零（理论上不会发生）
             if close_n_ago == 0:
@@ -165,19 +167,20 @@ try:
             momentum = (close_cur - close_n_ago) / close_n_ago * 100.0
 
             # ---- 均线过滤 ----
-            ma_filter = ma(close, FILTER_N)
-            ma_cur = ma_filter.iloc[-2]  # 当前均线值
+            # 只需要最近完成K线处的均线值：直接对截止到 -2 的 FILTER_N 个收盘价求均值
+            ma_cur = close[-(FILTER_N + 1):-1].mean()  # 当前均线值
 
             # 判断价格是否在均线之上/之下
             price_above_ma = close_cur > ma_cur   # 价格在均线上方（多头环境）
             price_below_ma = close_cur < ma_cur   # 价格在均线下方（空头环境）
 
             # 打印状态信息
-            print(
-                f"[{klines['datetime'].iloc[-2]}] "
-                f"当前价={close_cur:.2f}，{MOMENTUM_N}周期前={close_n_ago:.2f}，"
-                f"动量={momentum:.2f}%，MA({FILTER_N})={ma_cur:.2f}"
-            )
+            if DEBUG:
+                print(
+                    f"[{klines['datetime'].iloc[-2]}] "
+                    f"当前价={close_cur:.2f}，{MOMENTUM_N}周期前={close_n_ago:.2f}，"
+                    f"动量={momentum:.2f}%，MA({FILTER_N})={ma_cur:.2f}"
+                )
 
             # ---- 查询持仓状态 ----
             position = api.get_position(SYMBOL)
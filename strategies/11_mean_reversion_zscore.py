@@ -105,8 +105,10 @@ Bollinger Band 下轨（供参考）：
 ================================================================================
 """
 
+import math
+from collections import deque
+
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import ma, std
 
 # ============================================================
 # 策略参数配置
@@ -137,9 +139,78 @@ quote = api.get_quote(SYMBOL)
 print(f"[Z-Score策略] 启动成功，交易品种：{SYMBOL}，K线周期：{KLINE_DURATION}秒")
 print(f"[Z-Score策略] 参数：回望N={ZSCORE_N}，开仓Z={ENTRY_Z}，平仓Z={EXIT_Z}，最大持仓={MAX_HOLD_BARS}根")
 
+
+class RollingMeanStd:
+    """
+    滑动窗口均值 / 标准差（Welford 增量更新）
+
+    维护窗口均值 mean 与离差平方和 M2：
+    - 窗口未满时按 Welford 公式加入新值
+    - 窗口已满时用新值替换最旧值：
+        新均值 = 均值 + (新值 - 旧值) / N
+        M2    += (新值 - 旧值) × (新值 - 新均值 + 旧值 - 旧均值)
+    每根K线 O(1) 更新，且不像 平方和 - 和² 那样容易产生数值抵消；
+    每 RECALC_EVERY 次更新再从窗口重新计算一次，消除长期运行的累积误差。
+    窗口内有 NaN（无数据的K线）时暂停增量更新并返回 NaN，最后一个 NaN 移出窗口时从窗口重算。
+    """
+
+    __slots__ = ("n", "_buf", "_mean", "_m2", "_nan", "_updates")   # 固定属性，省去实例 __dict__
+
+    RECALC_EVERY = 1000
+
+    def __init__(self, n):
+        self.n = n
+        self._buf = deque(maxlen=n)   # 窗口内的收盘价
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._nan = 0                 # 窗口内 NaN 的个数
+        self._updates = 0
+
+    def push(self, x):
+        """一根K线完成：把收盘价计入窗口"""
+        buf = self._buf
+        old = buf[0] if len(buf) == self.n else None
+        buf.append(x)                 # deque 满时自动移出最旧值
+        old_is_nan = old is not None and old != old
+        if old_is_nan:
+            self._nan -= 1
+        if x != x:
+            self._nan += 1
+        if self._nan:
+            return                    # 窗口内有 NaN：均值/标准差无效，暂停增量更新
+
+        if old_is_nan:
+            self._recalc()            # 最后一个 NaN 刚移出窗口，增量状态已失效，从窗口重算
+        elif old is None:
+            delta = x - self._mean
+            self._mean += delta / len(buf)
+            self._m2 += delta * (x - self._mean)
+        else:
+            old_mean = self._mean
+            self._mean += (x - old) / self.n
+            self._m2 += (x - old) * (x - self._mean + old - old_mean)
+
+        self._updates += 1
+        if self._updates % self.RECALC_EVERY == 0:
+            self._recalc()
+
+    def _recalc(self):
+        """从窗口内的数据重新计算均值与 M2"""
+        self._mean = sum(self._buf) / len(self._buf)
+        self._m2 = sum((v - self._mean) ** 2 for v in self._buf)
+
+    def mean_std(self):
+        """返回 (均值, 标准差)，窗口未填满或含 NaN 时返回 (nan, nan)"""
+        if len(self._buf) < self.n or self._nan:
+            return float("nan"), float("nan")
+        var = max(self._m2, 0.0) / (self.n - 1)   # 样本方差，与 tafunc.std 一致
+        return self._mean, math.sqrt(var)
+
+
 # 持仓计时器（记录当前持仓已持有多少根K线）
 hold_bars_count = 0           # 已持仓K线数
 last_signal_bar_index = -1   # 上次开仓时的K线索引（用于计算持仓时长）
+last_bar_id = None           # 上次处理的已完成K线 id
 
 # ============================================================
 # 主循环
@@ -148,24 +219,32 @@ try:
     # TargetPosTask：只需声明目标仓位，自动处理追单/撤单/部分成交
     target_pos = TargetPosTask(api, SYMBOL)
 
+    # 持仓对象由 TqSdk 随行情自动更新，循环外取一次即可
+    position = api.get_position(SYMBOL)
+
     while True:
         api.wait_update()
 
-        if api.is_changing(klines):
+        # 只在新K线出现（上一根K线刚完成）时计算指标、更新持仓计时器，
+        # 形成中K线的逐笔变动直接跳过
+        if api.is_changing(klines.iloc[-1], "datetime"):
 
-            close = klines["close"]  # 收盘价序列
+            bar_id = int(klines["id"].iloc[-2])   # 刚完成的K线
 
-            # ---- 计算Z-Score指标 ----
-            # N期均值
-            mean_n = ma(close, ZSCORE_N)
+            # 每根K线只取一次底层 ndarray，之后按下标读取，不再走 pandas 的 iloc
+            close = klines["close"].to_numpy(copy=False)  # 收盘价序列
+            close_cur = float(close[-2])                  # 最近完成K线的收盘价
 
-            # N期标准差（ddof=0，总体标准差，与tafunc.std一致）
-            std_n = std(close, ZSCORE_N)
+            # ---- 增量更新Z-Score所需的均值/标准差 ----
+            if last_bar_id is None or bar_id != last_bar_id + 1:
+                # 首次运行（或中间漏掉了K线）：用之前的已完成K线重建窗口
+                stats = RollingMeanStd(ZSCORE_N)
+                for price in close[-(ZSCORE_N + 1):-2].tolist():
+                    stats.push(price)
+            stats.push(close_cur)
+            last_bar_id = bar_id
 
-            # 取最近完成K线的数据
-            close_cur = close.iloc[-2]
-            mean_cur = mean_n.iloc[-2]
-            std_cur = std_n.iloc[-2]
+            mean_cur, std_cur = stats.mean_std()   # N期均值、N期标准差
 
             # 防止标准差为0（价格没有波动，无法计算Z-Score）
             if std_cur == 0 or std_cur != std_cur:  # 检查0和NaN
@@ -183,13 +262,12 @@ try:
             )
 
             # ---- 查询持仓 ----
-            position = api.get_position(SYMBOL)
             volume_long = position.volume_long
             volume_short = position.volume_short
 
             # ---- 更新持仓计时器 ----
             if volume_long > 0 or volume_short > 0:
-                hold_bars_count += 1  # 每根K线更新时增加计数
+                hold_bars_count += 1  # 每根新完成的K线加一
             else:
                 hold_bars_count = 0   # 无持仓时重置计数
 
@@ -104,6 +104,9 @@ TqSdk 是信易科技开源的 Python 量化交易开发包，面向国内期货
 ================================================================================
 """
 
+import bisect
+import time
+
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
 import math
 
@@ -116,27 +119,31 @@ GRID_HIGH = 2600                 # 网格区间上限（需根据实际价格调
 GRID_STEP = 40                   # 网格间距（每格40点）
 VOLUME = 1                       # 每格交易手数
 MAX_GRID_POSITION = 10           # 最大允许持仓手数（风控）
+STATUS_INTERVAL = 1.0            # 持仓状态打印的最小间隔（秒），避免每个 tick 都刷屏
 
 # ============================================================
 # 初始化网格
 # ============================================================
-# 根据区间和间距计算网格线列表
-grid_lines = []
-price = GRID_LOW
-while price <= GRID_HIGH:
-    grid_lines.append(round(price, 2))  # 保留2位小数，避免浮点误差
-    price += GRID_STEP
+# 根据区间和间距计算网格线（从低到高排序，运行中只读，用元组保存）
+# 第i条网格线 = GRID_LOW + i × GRID_STEP，按下标直接计算，
+# 不逐次累加 GRID_STEP，小数间距时也不会累积浮点误差
+GRID_COUNT = int((GRID_HIGH - GRID_LOW) / GRID_STEP + 1e-9)   # 网格数量
+grid_lines = tuple(round(GRID_LOW + i * GRID_STEP, 2) for i in range(GRID_COUNT + 1))
 
 print(f"[网格策略] 网格线设置：{grid_lines}")
 print(f"[网格策略] 共{len(grid_lines)}条网格线，区间[{GRID_LOW}, {GRID_HIGH}]，间距{GRID_STEP}")
 
 # 网格状态记录：记录每条网格线下方是否有持仓
-# key: 网格线价格, value: True=该层有持仓（已买入，等待价格回升卖出）
-grid_has_position = {line: False for line in grid_lines}
+# 用一个整数做位图：第 i 位为 1 表示第 i 条网格线（grid_lines[i]）有持仓
+# （已买入，等待价格回升卖出）；按下标做位运算，不必对浮点价格做字典哈希
+grid_pos_mask = 0
 
 # 上次价格（用于判断是否穿越网格线）
 last_price = None
 
+# 上次打印持仓状态的时间（time.monotonic()）
+last_status_time = 0.0
+
 # ============================================================
 # 初始化 TqApi
 # ============================================================
@@ -154,37 +161,6 @@ klines_1m = api.get_kline_serial(SYMBOL, 60, data_length=10)
 print(f"[网格策略] 启动成功，交易品种：{SYMBOL}")
 print(f"[网格策略] 最大持仓={MAX_GRID_POSITION}手，每格交易{VOLUME}手")
 
-
-def get_grid_below(price, grid_lines):
-    """
-    获取当前价格下方最近的网格线
-
-    参数：
-        price: 当前价格
-        grid_lines: 网格线列表（从低到高排序）
-
-    返回：
-        下方最近的网格线价格，如无则返回None
-    """
-    below = [g for g in grid_lines if g < price]
-    return below[-1] if below else None
-
-
-def get_grid_above(price, grid_lines):
-    """
-    获取当前价格上方最近的网格线
-
-    参数：
-        price: 当前价格
-        grid_lines: 网格线列表（从低到高排序）
-
-    返回：
-        上方最近的网格线价格，如无则返回None
-    """
-    above = [g for g in grid_lines if g > price]
-    return above[0] if above else None
-
-
 # ============================================================
 # 主循环：实时监控价格变化并执行网格交易
 # ============================================================
@@ -192,9 +168,11 @@ try:
     # TargetPosTask：只需声明目标仓位，自动处理追单/撤单/部分成交
     target_pos = TargetPosTask(api, SYMBOL)
 
+    # 持仓对象由 TqSdk 随行情自动更新，循环外取一次即可
+    position = api.get_position(SYMBOL)
+
     while True:
         api.wait_update()
-        position = api.get_position(SYMBOL)
 
         # 监控实时报价变化
         if api.is_changing(quote):
@@ -218,45 +196,45 @@ try:
                 if total_long > 0:
                     target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
                     # 重置所有网格状态
-                    for line in grid_lines:
-                        grid_has_position[line] = False
+                    grid_pos_mask = 0
                     print(f"[网格策略] 价格突破上限{GRID_HIGH}，清空全部多仓{total_long}手")
 
                 last_price = current_price
                 continue
 
-            # ---- 遍历所有网格线，检测是否发生穿越 ----
-            for grid_price in grid_lines:
-
-                # 检测价格从上方下穿网格线（上一价格>网格线 且 当前价格<网格线）
+            # ---- 检测本次价格变动穿越了哪些网格线 ----
+            # 网格线已从低到高排序，用二分查找直接定位被穿越的区间，无需遍历全部网格线
+            if current_price < last_price:
+                # 价格从上方下穿网格线（上一价格>网格线 且 当前价格<=网格线）
                 # 触发买入逻辑：在网格线附近买入
-                price_crossed_down = (last_price > grid_price) and (current_price <= grid_price)
-
-                # 检测价格从下方上穿网格线（上一价格<网格线 且 当前价格>网格线）
-                # 触发卖出逻辑：在网格线附近卖出（平仓）
-                price_crossed_up = (last_price < grid_price) and (current_price >= grid_price)
-
-                # 【买入逻辑】价格下穿网格线且该层没有持仓
-                if price_crossed_down and not grid_has_position[grid_price]:
-                    # 检查总持仓是否超过上限
-                    if total_long < MAX_GRID_POSITION:
+                lo_idx = bisect.bisect_left(grid_lines, current_price)
+                hi_idx = bisect.bisect_left(grid_lines, last_price)
+                for i in range(lo_idx, hi_idx):
+                    # 【买入逻辑】该层没有持仓，且总持仓未超过上限
+                    grid_price = grid_lines[i]
+                    if not (grid_pos_mask >> i) & 1 and total_long < MAX_GRID_POSITION:
                         new_total_long = min(total_long + VOLUME, MAX_GRID_POSITION)
                         target_pos.set_target_volume(new_total_long)   # 做多：TargetPosTask自动追单到目标仓位
-                        grid_has_position[grid_price] = True  # 标记该层有持仓
+                        grid_pos_mask |= 1 << i  # 标记该层有持仓
                         total_long = new_total_long  # 更新本地持仓计数
                         print(
                             f"[网格策略] 买入：网格线={grid_price}，"
                             f"当前价={current_price:.2f}，买入{VOLUME}手"
                         )
 
-                # 【卖出逻辑】价格上穿网格线且下方相邻网格有持仓
-                if price_crossed_up:
-                    # 找下方最近的持仓网格（卖出下方的持仓，实现低买高卖）
-                    grid_below = get_grid_below(grid_price, grid_lines)
-                    if grid_below is not None and grid_has_position.get(grid_below, False):
+            elif current_price > last_price:
+                # 价格从下方上穿网格线（上一价格<网格线 且 当前价格>=网格线）
+                # 触发卖出逻辑：在网格线附近卖出（平仓）
+                lo_idx = bisect.bisect_right(grid_lines, last_price)
+                hi_idx = bisect.bisect_right(grid_lines, current_price)
+                for i in range(max(lo_idx, 1), hi_idx):
+                    # 【卖出逻辑】下方相邻网格有持仓（卖出下方的持仓，实现低买高卖）
+                    grid_price = grid_lines[i]
+                    grid_below = grid_lines[i - 1]
+                    if (grid_pos_mask >> (i - 1)) & 1:
                         new_total_long = max(total_long - VOLUME, 0)
                         target_pos.set_target_volume(new_total_long)           # 平仓：TargetPosTask自动平掉全部持仓
-                        grid_has_position[grid_below] = False  # 清除该层持仓状态
+                        grid_pos_mask &= ~(1 << (i - 1))  # 清除该层持仓状态
                         total_long = new_total_long
                         profit_estimate = (grid_price - grid_below) * VOLUME
                         print(
@@ -268,13 +246,16 @@ try:
             # 更新上次价格
             last_price = current_price
 
-            # 定期打印持仓状态
-            active_grids = [g for g, has_pos in grid_has_position.items() if has_pos]
-            if active_grids:
-                print(
-                    f"[网格策略] 当前价={current_price:.2f}，"
-                    f"持仓网格={active_grids}，总持仓={total_long}手"
-                )
+            # 定期打印持仓状态（按时间限频，买卖记录仍逐笔打印）
+            if grid_pos_mask:
+                now = time.monotonic()
+                if now - last_status_time >= STATUS_INTERVAL:
+                    last_status_time = now
+                    active_grids = [g for i, g in enumerate(grid_lines) if (grid_pos_mask >> i) & 1]
+                    print(
+                        f"[网格策略] 当前价={current_price:.2f}，"
+                        f"持仓网格={active_grids}，总持仓={total_long}手"
+                    )
 
 except KeyboardInterrupt:
     print("[网格策略] 用户中断，策略停止运行")
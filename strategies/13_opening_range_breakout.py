@@ -110,7 +110,6 @@ Breakout》中系统性地提出和验证的。该策略认为，开盘后的前
 
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
 from tqsdk.tafunc import hhv, llv
-import datetime
 
 # ============================================================
 # 策略参数配置
@@ -133,6 +132,15 @@ if ORB_END_MIN >= 60:
     ORB_END_MIN -= 60
 # 例如：09:30 + 30分钟 = 10:00
 
+# K线 datetime 是 UTC 纳秒时间戳，换算成北京时间（UTC+8）当日的纳秒数后直接做整数比较，
+# 避免每次更新都构造 datetime / time 对象
+NS_PER_MIN = 60 * 10**9
+NS_PER_DAY = 24 * 60 * NS_PER_MIN
+TZ_OFFSET_NS = 8 * 60 * NS_PER_MIN              # 北京时间相对 UTC 的偏移
+OPEN_NS = (OPEN_HOUR * 60 + OPEN_MIN) * NS_PER_MIN           # 开盘时间
+ORB_END_NS = (ORB_END_HOUR * 60 + ORB_END_MIN) * NS_PER_MIN  # 开盘区间结束时间
+CLOSE_NS = (CLOSE_HOUR * 60 + CLOSE_MIN) * NS_PER_MIN        # 收盘强制平仓时间
+
 # ============================================================
 # 初始化 TqApi
 # ============================================================
@@ -159,7 +167,7 @@ orb_high = None           # 开盘区间最高价
 orb_low = None            # 开盘区间最低价
 orb_confirmed = False     # 开盘区间是否已确立
 traded_today = False      # 今天是否已经交易过
-current_date = None       # 当前交易日期
+current_day = None        # 当前交易日期（北京时间自 1970-01-01 起的天数）
 stop_loss_price = None    # 当前止损价格
 
 
@@ -181,28 +189,56 @@ try:
     # TargetPosTask：只需声明目标仓位，自动处理追单/撤单/部分成交
     target_pos = TargetPosTask(api, SYMBOL)
 
+    # 持仓对象由 TqSdk 随行情自动更新，循环外取一次即可
+    position = api.get_position(SYMBOL)
+
+    # 最近完成K线的北京时间当日纳秒数（收到第一根新K线前为 None）
+    bar_tod = None
+
     while True:
         api.wait_update()
-        position = api.get_position(SYMBOL)
 
         if api.is_changing(klines):
 
-            # 获取最新完成K线时间
-            bar_dt_ns = klines["datetime"].iloc[-2]  # 纳秒时间戳
+            # ---- 有新K线完成时：更新时间、检测新交易日、收集开盘区间高低点 ----
+            # 最新K线内的 tick 变化不会改变已完成K线，这部分只需每根K线执行一次
+            if api.is_changing(klines.iloc[-1], "datetime"):
+                # 获取最新完成K线时间
+                bar_dt_ns = klines["datetime"].iloc[-2]  # 纳秒时间戳
+
+                # 换算为北京时间的日期序号和当日纳秒数
+                bar_day, bar_tod = divmod(int(bar_dt_ns) + TZ_OFFSET_NS, NS_PER_DAY)
+
+                # ---- 检测新交易日 ----
+                if current_day != bar_day:
+                    current_day = bar_day
+                    reset_daily_state()  # 新的一天，重置状态
+
+                # ---- 开盘区间建立阶段 ----
+                # 在开盘区间时段内（开盘 ~ ORB结束时间），收集高低点
+                if OPEN_NS <= bar_tod < ORB_END_NS:
+                    # 在开盘区间内，不断更新最高/最低价
+                    bar_high = float(klines["high"].iloc[-2])
+                    bar_low = float(klines["low"].iloc[-2])
+
+                    if orb_high is None:
+                        orb_high = bar_high
+                        orb_low = bar_low
+                    else:
+                        orb_high = max(orb_high, bar_high)  # 滚动更新最高价
+                        orb_low = min(orb_low, bar_low)     # 滚动更新最低价
 
-            # 将纳秒时间戳转换为datetime对象
-            bar_dt = datetime.datetime.fromtimestamp(bar_dt_ns / 1e9)
-            bar_date = bar_dt.date()
-            bar_time = bar_dt.time()
+                    print(
+                        f"[ORB策略] 建立开盘区间中 {bar_tod // NS_PER_MIN // 60:02d}:{bar_tod // NS_PER_MIN % 60:02d}："
+                        f"区间高={orb_high:.2f}，区间低={orb_low:.2f}"
+                    )
 
-            # ---- 检测新交易日 ----
-            if current_date != bar_date:
-                current_date = bar_date
-                reset_daily_state()  # 新的一天，重置状态
+            # 尚未收到新K线时没有K线时间，后续判断无从进行
+            if bar_tod is None:
+                continue
 
             # ---- 强制平仓：收盘前固定时间 ----
-            close_time = datetime.time(CLOSE_HOUR, CLOSE_MIN)
-            if bar_time >= close_time:
+            if bar_tod >= CLOSE_NS:
                 if position.volume_long > 0:
                     target_pos.set_target_volume(0)           # 平仓：TargetPosTask自动平掉全部持仓
                     print(f"[ORB策略] 收盘强制平多：{position.volume_long}手")
@@ -211,30 +247,8 @@ try:
                     print(f"[ORB策略] 收盘强制平空：{position.volume_short}手")
                 continue  # 收盘时间后不再执行其他逻辑
 
-            # ---- 开盘区间建立阶段 ----
-            # 在开盘区间时段内（开盘 ~ ORB结束时间），收集高低点
-            open_time = datetime.time(OPEN_HOUR, OPEN_MIN)
-            orb_end_time = datetime.time(ORB_END_HOUR, ORB_END_MIN)
-
-            if open_time <= bar_time < orb_end_time:
-                # 在开盘区间内，不断更新最高/最低价
-                bar_high = klines["high"].iloc[-2]
-                bar_low = klines["low"].iloc[-2]
-
-                if orb_high is None:
-                    orb_high = bar_high
-                    orb_low = bar_low
-                else:
-                    orb_high = max(orb_high, bar_high)  # 滚动更新最高价
-                    orb_low = min(orb_low, bar_low)     # 滚动更新最低价
-
-                print(
-                    f"[ORB策略] 建立开盘区间中 {bar_time}："
-                    f"区间高={orb_high:.2f}，区间低={orb_low:.2f}"
-                )
-
             # ---- 开盘区间确立 ----
-            elif bar_time >= orb_end_time and not orb_confirmed:
+            if bar_tod >= ORB_END_NS and not orb_confirmed:
                 # 开盘区间时间结束，区间确立
                 if orb_high is not None and orb_low is not None:
                     orb_confirmed = True
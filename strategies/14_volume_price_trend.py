@@ -116,8 +116,9 @@ M期平均成交量：
 ================================================================================
 """
 
+from collections import deque
+
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import hhv, llv, ma
 
 # ============================================================
 # 策略参数配置
@@ -131,6 +132,92 @@ VOLUME = 1                       # 每次交易手数
 KLINE_DURATION = 86400           # K线周期：86400秒 = 1天（日线）
 DATA_LENGTH = 150                # 获取K线数量
 
+
+class RollingExtrema:
+    """
+    滑动窗口最高值 / 最低值（单调队列，增量更新）。
+
+    队列按时间顺序保存 (序号, 值)，且值单调（求最高时递减，求最低时递增）：
+    新值入队前先弹出队尾所有被它"压住"的旧值，再从队首移出已滑出窗口的元素，
+    队首即为窗口极值。每根 K 线均摊 O(1)，不必每次对 N 根 K 线求 hhv/llv。
+    """
+
+    __slots__ = ("period", "is_max", "skipna", "_q", "_count", "_last_nan")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period: int, is_max: bool, skipna: bool = True):
+        self.period = period
+        self.is_max = is_max     # True 求最高值，False 求最低值
+        self.skipna = skipna     # True 忽略 NaN（同 pandas max/min），False 窗口含 NaN 即为 nan（同 hhv/llv）
+        self._q = deque()        # (序号, 值)
+        self._count = 0          # 已计入的 K 线数
+        self._last_nan = -period  # 最近一个 NaN 的序号
+
+    def push(self, value: float):
+        """一根 K 线完成：计入它的值并移出滑出窗口的旧值"""
+        q = self._q
+        if value != value:
+            # NaN 与任何值比较都为 False，入队后既弹不出、也压不住旧值，因此不入队，只记下位置
+            self._last_nan = self._count
+        else:
+            if self.is_max:
+                while q and q[-1][1] <= value:
+                    q.pop()
+            else:
+                while q and q[-1][1] >= value:
+                    q.pop()
+            q.append((self._count, value))
+        self._count += 1
+        while q and q[0][0] < self._count - self.period:
+            q.popleft()
+
+    @property
+    def value(self) -> float:
+        """窗口极值（窗口未填满、全为 NaN，或 skipna=False 且含 NaN 时返回 nan）"""
+        if self._count < self.period or not self._q:
+            return float("nan")
+        if not self.skipna and self._last_nan >= self._count - self.period:
+            return float("nan")
+        return self._q[0][1]
+
+
+class RollingMA:
+    """
+    滑动窗口简单均线（增量更新）。
+
+    维护窗口内数值之和：每根新 K 线只需加入新值、移出最旧值，
+    每次更新都是 O(1)，不必对整段 K 线重新调用 ma()。
+    """
+
+    __slots__ = ("period", "_buf", "_sum", "_nan")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period: int):
+        self.period = period
+        self._buf = deque(maxlen=period)   # 窗口内的数值
+        self._sum = 0.0                    # 窗口内非 NaN 数值之和
+        self._nan = 0                      # 窗口内 NaN 的个数（新上市合约开头的 K 线没有数据）
+
+    def push(self, value: float):
+        """新 K 线：移出窗口最旧的值，加入新值"""
+        if len(self._buf) == self.period:
+            old = self._buf[0]
+            if old != old:
+                self._nan -= 1
+            else:
+                self._sum -= old
+        self._buf.append(value)
+        if value != value:
+            self._nan += 1
+        else:
+            self._sum += value
+
+    @property
+    def value(self) -> float:
+        """当前均线值（窗口未填满或含 NaN 时返回 nan，与 ma() 一致）"""
+        if len(self._buf) < self.period or self._nan:
+            return float("nan")
+        return self._sum / self.period
+
+
 # ============================================================
 # 初始化 TqApi
 # ============================================================
@@ -154,6 +241,8 @@ print(
     f"量线周期={VOL_MA_N}，放量倍数={VOL_MULTIPLIER}"
 )
 
+last_bar_id = None   # 上次计入通道/量线窗口的已完成K线 id
+
 # ============================================================
 # 主循环：等待K线更新并计算量价信号
 # ============================================================
@@ -161,40 +250,58 @@ try:
     while True:
         api.wait_update()
 
-        if api.is_changing(klines):
+        # 只在新K线产生时计算（最新K线内的 tick 变化不影响已完成K线）
+        if api.is_changing(klines.iloc[-1], "datetime"):
 
-            close = klines["close"]    # 收盘价序列
-            volume = klines["volume"]  # 成交量序列
-            high = klines["high"]      # 最高价序列
-            low = klines["low"]        # 最低价序列
-
-            # ---- 计算价格通道 ----
-            # 突破通道：用于开仓判断
-            # 注意：为避免当前K线影响，用 .iloc[-3:] 之前的区间判断突破
-            # 实现：取前N根K线（不含当前K线-2）的高低极值
-            # tafunc的hhv/llv包含当前点，我们用N+1期并取前一根的值
-            channel_high_n = hhv(close, BREAKOUT_N)   # N期收盘价最高（含当前点）
-            channel_low_n = llv(close, BREAKOUT_N)    # N期收盘价最低
-
-            # 平仓通道：用于平仓判断（更短周期，更灵敏）
-            channel_high_exit = hhv(high, EXIT_N)
-            channel_low_exit = llv(low, EXIT_N)
-
-            # ---- 计算成交量指标 ----
-            vol_ma = ma(volume, VOL_MA_N)  # 成交量均线
+            close = klines["close"].to_numpy()    # 收盘价序列
+            volume = klines["volume"].to_numpy()  # 成交量序列
+            high = klines["high"].to_numpy()      # 最高价序列
+            low = klines["low"].to_numpy()        # 最低价序列
 
             # 取最新完成K线的数据（-2为当前完成K线）
-            close_cur = close.iloc[-2]            # 当前收盘价
-            close_prev = close.iloc[-3]           # 前一收盘价
-
-            # 突破基准：用前N根K线（不含当前K线）的极值，即 index -3 位置的通道值
+            close_cur = float(close[-2])          # 当前收盘价
+            close_prev = float(close[-3])         # 前一收盘价
+
+            bar_id = int(klines["id"].iloc[-2])
+            if last_bar_id is None or bar_id != last_bar_id + 1:
+                # 首次运行（或中间漏掉了K线）：用当前完成K线之前的历史重建各个窗口
+                # skipna=False：窗口含 NaN 时通道为 nan，与原先的 hhv/llv 一致
+                break_high = RollingExtrema(BREAKOUT_N, is_max=True, skipna=False)
+                break_low = RollingExtrema(BREAKOUT_N, is_max=False, skipna=False)
+                exit_high_calc = RollingExtrema(EXIT_N, is_max=True, skipna=False)
+                exit_low_calc = RollingExtrema(EXIT_N, is_max=False, skipna=False)
+                vol_ma = RollingMA(VOL_MA_N)
+                start = -(max(BREAKOUT_N, EXIT_N, VOL_MA_N) + 2)
+                for c, h, l, v in zip(close[start:-2].tolist(), high[start:-2].tolist(),
+                                      low[start:-2].tolist(), volume[start:-2].tolist()):
+                    break_high.push(c)
+                    break_low.push(c)
+                    exit_high_calc.push(h)
+                    exit_low_calc.push(l)
+                    vol_ma.push(v)
+
+            # ---- 价格通道 ----
+            # 突破基准：前N根K线（不含当前完成K线）的收盘价极值，
+            # 在计入当前K线之前读取，等价于 hhv(close, N).iloc[-3] / llv(close, N).iloc[-3]
             # 这样可以判断当前K线是否突破了前N期极值
-            prev_channel_high = channel_high_n.iloc[-3]  # 前N期最高价（不含当前）
-            prev_channel_low = channel_low_n.iloc[-3]    # 前N期最低价（不含当前）
+            prev_channel_high = break_high.value  # 前N期最高价（不含当前）
+            prev_channel_low = break_low.value    # 前N期最低价（不含当前）
 
-            # 当前K线成交量
-            vol_cur = volume.iloc[-2]
-            vol_ma_cur = vol_ma.iloc[-2]           # 当前成交量均线
+            # 把刚完成的K线计入各个窗口
+            vol_cur = float(volume[-2])           # 当前K线成交量
+            break_high.push(close_cur)
+            break_low.push(close_cur)
+            exit_high_calc.push(float(high[-2]))
+            exit_low_calc.push(float(low[-2]))
+            vol_ma.push(vol_cur)
+            last_bar_id = bar_id
+
+            # 平仓通道：用于平仓判断（更短周期，更灵敏），含当前完成K线
+            exit_high = exit_high_calc.value      # EXIT_N期最高价
+            exit_low = exit_low_calc.value        # EXIT_N期最低价
+
+            # ---- 成交量指标 ----
+            vol_ma_cur = vol_ma.value             # 当前成交量均线
 
             # 计算成交量倍数（放量比例）
             if vol_ma_cur > 0:
@@ -202,10 +309,6 @@ try:
             else:
                 vol_ratio = 0
 
-            # 平仓通道值（当前）
-            exit_high = channel_high_exit.iloc[-2]  # EXIT_N期最高价
-            exit_low = channel_low_exit.iloc[-2]    # EXIT_N期最低价
-
             # 打印状态
             print(
                 f"[{klines['datetime'].iloc[-2]}] "
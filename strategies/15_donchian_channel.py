@@ -99,6 +99,8 @@ Middle_N = (Upper_N + Lower_N) / 2
   VOLUME      : 每次开仓手数，默认1手
 """
 
+from collections import deque
+
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
 
 # ===================== 策略参数 =====================
@@ -110,6 +112,53 @@ VOLUME = 1                 # 每次开仓手数
 # ===================================================
 
 
+class RollingExtrema:
+    """
+    滑动窗口最高价 / 最低价（单调队列，增量更新）。
+
+    队列按时间顺序保存 (序号, 价格)，且价格单调（求最高时递减，求最低时递增）：
+    新价格入队前先弹出队尾所有被它"压住"的旧价格，再从队首移出已滑出窗口的元素，
+    队首即为窗口极值。每根 K 线均摊 O(1)，不必每次对 N 根 K 线切片求 max/min。
+    """
+
+    __slots__ = ("period", "is_max", "skipna", "_q", "_count", "_last_nan")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period: int, is_max: bool, skipna: bool = True):
+        self.period = period
+        self.is_max = is_max     # True 求最高价，False 求最低价
+        self.skipna = skipna     # True 忽略 NaN（同 pandas max/min），False 窗口含 NaN 即为 nan（同 hhv/llv）
+        self._q = deque()        # (序号, 价格)
+        self._count = 0          # 已计入的 K 线数
+        self._last_nan = -period  # 最近一个 NaN 的序号
+
+    def push(self, price: float):
+        """一根 K 线完成：计入它的价格并移出滑出窗口的旧价格"""
+        q = self._q
+        if price != price:
+            # NaN 与任何值比较都为 False，入队后既弹不出、也压不住旧价格，因此不入队，只记下位置
+            self._last_nan = self._count
+        else:
+            if self.is_max:
+                while q and q[-1][1] <= price:
+                    q.pop()
+            else:
+                while q and q[-1][1] >= price:
+                    q.pop()
+            q.append((self._count, price))
+        self._count += 1
+        while q and q[0][0] < self._count - self.period:
+            q.popleft()
+
+    @property
+    def value(self) -> float:
+        """窗口极值（窗口未填满、全为 NaN，或 skipna=False 且含 NaN 时返回 nan）"""
+        if self._count < self.period or not self._q:
+            return float("nan")
+        if not self.skipna and self._last_nan >= self._count - self.period:
+            return float("nan")
+        return self._q[0][1]
+
+
 def main():
     api = TqApi(
         account=TqSim(),
@@ -124,18 +173,41 @@ def main():
 
     print(f"[唐奇安通道] 启动 | {SYMBOL} | 入场N={N_ENTER} | 出场N={N_EXIT}")
 
+    last_bar_id = None   # 上次计入通道的已完成 K 线 id
+
     while True:
         api.wait_update()
 
-        if not api.is_changing(klines):
+        # 仅在新 K 线出现（上一根 K 线刚完成）时计算，形成中 K 线的逐笔变动直接跳过
+        if not api.is_changing(klines.iloc[-1], "datetime"):
             continue
 
         # ---- 计算通道 ----
-        # 使用已完成的K线（iloc[-(N+1):-1] 取倒数N+1到倒数第1根，即前N根完成K线）
-        high_enter = klines.high.iloc[-(N_ENTER + 1):-1].max()   # 入场上轨
-        low_enter  = klines.low.iloc[-(N_ENTER + 1):-1].min()    # 入场下轨
-        high_exit  = klines.high.iloc[-(N_EXIT + 1):-1].max()    # 出场上轨
-        low_exit   = klines.low.iloc[-(N_EXIT + 1):-1].min()     # 出场下轨
+        # 使用已完成的K线（前N根完成K线，含最近完成的那根），用单调队列增量维护
+        bar_id = klines.id.iloc[-2]
+        if last_bar_id is None or bar_id != last_bar_id + 1:
+            # 首次运行（或中间漏掉了 K 线）：用之前的已完成 K 线重建四条通道的窗口
+            hi_enter, lo_enter = RollingExtrema(N_ENTER, is_max=True), RollingExtrema(N_ENTER, is_max=False)
+            hi_exit, lo_exit = RollingExtrema(N_EXIT, is_max=True), RollingExtrema(N_EXIT, is_max=False)
+            hist_high = klines.high.iloc[-(max(N_ENTER, N_EXIT) + 1):-2].tolist()
+            hist_low = klines.low.iloc[-(max(N_ENTER, N_EXIT) + 1):-2].tolist()
+            for h, l in zip(hist_high, hist_low):
+                hi_enter.push(h)
+                lo_enter.push(l)
+                hi_exit.push(h)
+                lo_exit.push(l)
+        # 把刚完成的 K 线计入通道
+        last_high, last_low = klines.high.iloc[-2], klines.low.iloc[-2]
+        hi_enter.push(last_high)
+        lo_enter.push(last_low)
+        hi_exit.push(last_high)
+        lo_exit.push(last_low)
+        last_bar_id = bar_id
+
+        high_enter = hi_enter.value   # 入场上轨
+        low_enter  = lo_enter.value   # 入场下轨
+        high_exit  = hi_exit.value    # 出场上轨
+        low_exit   = lo_exit.value    # 出场下轨
 
         # 最新完成K线的收盘价（-2是最近完成的那根）
         last_close = klines.close.iloc[-2]
@@ -102,9 +102,9 @@ DATA_LENGTH   : 历史K线数量，建议 > AROON_PERIOD × 3
 ================================================================================
 """
 
-import numpy as np
+from collections import deque
+
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import crossup, crossdown
 
 # ==================== 策略参数配置 ====================
 SYMBOL         = "SHFE.rb2405"   # 交易品种：螺纹钢主力合约
@@ -114,42 +114,57 @@ KLINE_DURATION = 5 * 60          # K线周期：5分钟（单位：秒）
 VOLUME         = 1               # 每次交易手数
 DATA_LENGTH    = 200             # 拉取历史K线数量
 
-def calc_aroon(high_series, low_series, period):
-    """
-    手动计算Aroon Up和Aroon Down指标
-    
-    参数：
-        high_series: 最高价序列（pandas Series）
-        low_series:  最低价序列（pandas Series）
-        period:      计算周期
-    
-    返回：
-        aroon_up:   Aroon Up序列（numpy array）
-        aroon_down: Aroon Down序列（numpy array）
+class AroonStream:
     """
-    n = len(high_series)
-    aroon_up   = np.full(n, np.nan)   # 初始化Aroon Up数组
-    aroon_down = np.full(n, np.nan)   # 初始化Aroon Down数组
-
-    for i in range(period, n):
-        # 取最近period+1根K线的区间（包含当前K线）
-        high_window = high_series.iloc[i - period: i + 1].values
-        low_window  = low_series.iloc[i - period: i + 1].values
+    增量计算 Aroon Up / Aroon Down
 
-        # 找到最高价所在位置（从右侧算距离）
-        # argmax返回从左算的索引，period - argmax = 距当前K线的根数
-        high_idx = np.argmax(high_window)   # 区间内最高价的位置（0-indexed）
-        low_idx  = np.argmin(low_window)    # 区间内最低价的位置（0-indexed）
-
-        # 距当前K线的周期数 = period - 该位置索引
-        periods_since_high = period - high_idx
-        periods_since_low  = period - low_idx
+    窗口为最近 period+1 根K线（包含当前K线）。两个单调队列按时间顺序保存
+    (序号, 价格)，队首即为窗口内最高价 / 最低价所在的K线：
+    新K线入队前弹出队尾严格被它"压住"的旧价格（相同价格保留较早的一根，
+    与 np.argmax/argmin 取第一个极值一致），再移出已滑出窗口的队首。
+    每根K线均摊 O(1)，不必每次对整段K线重新计算。
+    """
 
+    __slots__ = ("period", "_high_q", "_low_q", "_count")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period):
+        self.period = period
+        self._high_q = deque()   # (序号, 最高价)，价格单调递减
+        self._low_q  = deque()   # (序号, 最低价)，价格单调递增
+        self._count  = 0         # 已计入的K线数
+
+    def push(self, high, low):
+        """一根K线完成：计入它的最高价、最低价"""
+        i = self._count
+        high_q, low_q = self._high_q, self._low_q
+        while high_q and high_q[-1][1] < high:
+            high_q.pop()
+        high_q.append((i, high))
+        while low_q and low_q[-1][1] > low:
+            low_q.pop()
+        low_q.append((i, low))
+        self._count = i + 1
+
+        # 移出已滑出窗口（最近 period+1 根）的K线
+        start = i - self.period
+        if high_q[0][0] < start:
+            high_q.popleft()
+        if low_q[0][0] < start:
+            low_q.popleft()
+
+    @property
+    def value(self):
+        """返回 (Aroon Up, Aroon Down)，K线不足 period+1 根时返回 (nan, nan)"""
+        start = self._count - 1 - self.period
+        if start < 0:
+            return float("nan"), float("nan")
+        # 极值在窗口内的位置（0-indexed），距当前K线的周期数 = period - 该位置
+        periods_since_high = self.period - (self._high_q[0][0] - start)
+        periods_since_low  = self.period - (self._low_q[0][0] - start)
         # 计算Aroon值：(period - 距离) / period × 100
-        aroon_up[i]   = (period - periods_since_high) / period * 100
-        aroon_down[i] = (period - periods_since_low)  / period * 100
-
-    return aroon_up, aroon_down
+        aroon_up   = (self.period - periods_since_high) / self.period * 100
+        aroon_down = (self.period - periods_since_low)  / self.period * 100
+        return aroon_up, aroon_down
 
 
 def main():
@@ -166,38 +181,41 @@ def main():
     # 初始化 TargetPosTask，自动管理持仓目标（自动处理追单/撤单/部分成交）
     target_pos = TargetPosTask(api, SYMBOL)
 
+    last_bar_id = None   # 上次计入Aroon窗口的已完成K线 id
+
     try:
         while True:
             api.wait_update()  # 等待任意数据更新
 
-            # 只在K线有新数据时重新计算指标（提升效率）
+            # 只在新K线出现（上一根K线刚完成）时计算指标，形成中K线的逐笔变动直接跳过
             if api.is_changing(klines.iloc[-1], "datetime"):
 
-                # ====== 提取收盘、最高、最低价序列 ======
-                close  = klines["close"]
-                high   = klines["high"]
-                low    = klines["low"]
-
-                # ====== 计算Aroon Up 和 Aroon Down ======
-                aroon_up, aroon_down = calc_aroon(high, low, AROON_PERIOD)
-
-                # 转换为pandas Series以使用tafunc的crossup/crossdown
-                import pandas as pd
-                aroon_up_s   = pd.Series(aroon_up,   name="aroon_up")
-                aroon_down_s = pd.Series(aroon_down, name="aroon_down")
+                # ====== 增量更新Aroon Up 和 Aroon Down ======
+                # 使用已完成K线（-2为最新完成K线），避免用未完成K线的首个tick
+                bar_id = klines.id.iloc[-2]
+                if last_bar_id is None or bar_id != last_bar_id + 1:
+                    # 首次运行（或中间漏掉了K线）：用之前的已完成K线重建窗口
+                    # 多取一根（共 period+1 根），使上一根K线的 Up/Down 有效，
+                    # 重建当根的交叉信号才不会漏掉
+                    aroon = AroonStream(AROON_PERIOD)
+                    hist_high = klines.high.iloc[-(AROON_PERIOD + 3):-2].tolist()
+                    hist_low  = klines.low.iloc[-(AROON_PERIOD + 3):-2].tolist()
+                    for h, l in zip(hist_high, hist_low):
+                        aroon.push(h, l)
+                    prev_aroon_up, prev_aroon_down = aroon.value
+                aroon.push(klines.high.iloc[-2], klines.low.iloc[-2])
+                last_bar_id = bar_id
+
+                # 取最新完成K线的Aroon值
+                last_aroon_up, last_aroon_down = aroon.value
 
                 # ====== 计算交叉信号 ======
-                # crossup(a, b) 返回Series：a从下方上穿b时为True
-                cross_up_signal   = crossup(aroon_up_s,   aroon_down_s)  # Aroon Up 上穿 Aroon Down
-                cross_down_signal = crossup(aroon_down_s, aroon_up_s)    # Aroon Down 上穿 Aroon Up
-
-                # 取最新一根K线的值（iloc[-1]为最新，iloc[-2]为上一根）
-                last_aroon_up      = aroon_up[-1]
-                last_aroon_down    = aroon_down[-1]
-                last_cross_up      = bool(cross_up_signal.iloc[-1])    # 是否刚发生Up上穿
-                last_cross_down    = bool(cross_down_signal.iloc[-1])  # 是否刚发生Down上穿
+                # 与上一根K线的值比较（与 tafunc.crossup 相同：上一根 a<=b，本根 a>b）
+                last_cross_up   = prev_aroon_up <= prev_aroon_down and last_aroon_up > last_aroon_down    # Aroon Up 上穿 Aroon Down
+                last_cross_down = prev_aroon_down <= prev_aroon_up and last_aroon_down > last_aroon_up    # Aroon Down 上穿 Aroon Up
+                prev_aroon_up, prev_aroon_down = last_aroon_up, last_aroon_down
 
-                print(f"[{klines.iloc[-1]['datetime']}] "
+                print(f"[{klines.iloc[-2]['datetime']}] "
                       f"AroonUp={last_aroon_up:.1f}, AroonDown={last_aroon_down:.1f}")
 
                 # ====== 交易逻辑 ======
@@ -111,10 +111,9 @@ DATA_LENGTH   : 历史K线数量，建议 > (RSI_PERIOD + STOCH_PERIOD) × 3
 ================================================================================
 """
 
-import numpy as np
-import pandas as pd
+from collections import deque
+
 from tqsdk import TqApi, TqAuth, TqSim, TargetPosTask
-from tqsdk.tafunc import ma, crossup, crossdown
 
 # ==================== 策略参数配置 ====================
 SYMBOL         = "SHFE.au2406"   # 交易品种：黄金主力合约
@@ -129,59 +128,162 @@ VOLUME         = 1                # 每次交易手数
 DATA_LENGTH    = 300              # 历史K线数量（需足够长）
 
 
-def calc_rsi(close_series, period):
-    """
-    计算RSI相对强弱指数
-    
-    使用Wilder平滑方法（指数平均）
-    
-    参数：
-        close_series: 收盘价序列（pandas Series）
-        period: RSI周期
-    返回：
-        rsi: RSI值序列（pandas Series，取值0-100）
+class WilderRSI:
     """
-    delta  = close_series.diff()                   # 计算每根K线的价格变化量
-    gain   = delta.clip(lower=0)                   # 只保留上涨幅度（跌则为0）
-    loss   = (-delta).clip(lower=0)                # 只保留下跌幅度（涨则为0）
-
-    # 使用指数加权移动平均（Wilder方法，alpha=1/period）
-    avg_gain = gain.ewm(alpha=1/period, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1/period, adjust=False).mean()
+    Wilder RSI 增量计算器。
 
-    rs  = avg_gain / (avg_loss + 1e-10)            # 避免除零
-    rsi = 100 - (100 / (1 + rs))                   # RSI公式
-    return rsi
-
-
-def calc_stoch_rsi(rsi_series, stoch_period, smooth_k, smooth_d):
+    使用Wilder平滑方法（指数平均，alpha=1/period）：
+    每根已完成K线只把它的涨跌幅递推进 avg_gain / avg_loss，计算量 O(1)，
+    结果与对整段收盘价做 diff / clip / ewm(adjust=False) 一致。
     """
-    对RSI序列做随机化处理，计算StochRSI的K线和D线
-    
-    参数：
-        rsi_series:   RSI值序列（pandas Series）
-        stoch_period: 随机化处理周期（取RSI的最高/最低值的窗口）
-        smooth_k:     K线平滑周期
-        smooth_d:     D线平滑周期（信号线）
-    返回：
-        stoch_k: K线序列（pandas Series，取值0~1）
-        stoch_d: D线序列（pandas Series，取值0~1）
+
+    __slots__ = ("alpha", "avg_gain", "avg_loss", "prev_close")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period):
+        self.alpha = 1.0 / period
+        self.avg_gain = None     # 平均涨幅
+        self.avg_loss = None     # 平均跌幅
+        self.prev_close = None   # 最近一根已完成K线的收盘价
+
+    def push(self, price):
+        """一根K线完成：把它相对上一根的涨跌幅计入平滑均值"""
+        if price != price:       # 跳过无数据的K线（NaN）
+            return
+        if self.prev_close is not None:
+            delta = price - self.prev_close
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            if self.avg_gain is None:
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain += self.alpha * (gain - self.avg_gain)
+                self.avg_loss += self.alpha * (loss - self.avg_loss)
+        self.prev_close = price
+
+    def seed(self, prices):
+        """用一段历史收盘价（ndarray）建立平滑状态，涨跌幅整段向量化求出，只剩递推逐根进行"""
+        prices = prices[prices == prices]   # 去掉无数据的K线（NaN）
+        if len(prices) == 0:
+            return
+        deltas = prices[1:] - prices[:-1]
+        gains = deltas.clip(min=0).tolist()
+        losses = (-deltas).clip(min=0).tolist()
+        if gains:
+            g, l = gains[0], losses[0]
+            a = self.alpha
+            for gain, loss in zip(gains[1:], losses[1:]):
+                g += a * (gain - g)
+                l += a * (loss - l)
+            self.avg_gain, self.avg_loss = g, l
+        self.prev_close = float(prices[-1])
+
+    @property
+    def value(self):
+        """当前 RSI（数据不足时返回 nan）"""
+        if self.avg_gain is None:
+            return float("nan")
+        rs = self.avg_gain / (self.avg_loss + 1e-10)   # 避免除零
+        return 100 - (100 / (1 + rs))
+
+
+class RollingMean:
     """
-    # 滚动窗口内的RSI最高值和最低值
-    rsi_max = rsi_series.rolling(window=stoch_period).max()
-    rsi_min = rsi_series.rolling(window=stoch_period).min()
+    滑动窗口简单平均（增量更新）。
 
-    # StochRSI原始值：归一化到[0,1]
-    denom       = rsi_max - rsi_min
-    stoch_raw   = (rsi_series - rsi_min) / (denom.replace(0, np.nan))  # 避免分母为0
+    维护窗口内非 NaN 值之和与 NaN 个数：窗口未填满或含 NaN 时返回 NaN，
+    与 pandas 的 rolling(window).mean() 一致，每次更新 O(1)。
+    """
 
-    # 对StochRSI进行平滑得到K线
-    stoch_k = stoch_raw.rolling(window=smooth_k).mean()
+    __slots__ = ("period", "_buf", "_sum", "_nan")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, period):
+        self.period = period
+        self._buf = deque(maxlen=period)   # 窗口内的数值
+        self._sum = 0.0                    # 窗口内非 NaN 值之和
+        self._nan = 0                      # 窗口内 NaN 的个数
+
+    def push(self, x):
+        """加入新值，移出窗口最旧的值"""
+        if len(self._buf) == self.period:
+            old = self._buf[0]
+            if old != old:
+                self._nan -= 1
+            else:
+                self._sum -= old
+        self._buf.append(x)
+        if x != x:
+            self._nan += 1
+        else:
+            self._sum += x
+
+    @property
+    def value(self):
+        """当前均值（窗口未填满或含 NaN 时返回 nan）"""
+        if len(self._buf) < self.period or self._nan:
+            return float("nan")
+        return self._sum / self.period
+
+
+class StochRsiStream:
+    """
+    对RSI序列做随机化处理，增量计算StochRSI的K线和D线
 
-    # 对K线再平滑得到D线（信号线）
-    stoch_d = stoch_k.rolling(window=smooth_d).mean()
+    - 最近 stoch_period 个RSI的最高/最低值用单调队列维护（队首即极值）
+    - StochRSI原始值 = (RSI - 最低) / (最高 - 最低)，分母为0时为 NaN
+    - K = 原始值的 smooth_k 期简单平均，D = K 的 smooth_d 期简单平均
+    每根K线均摊 O(1)，结果与对整段RSI做 rolling max/min/mean 一致。
+    """
 
-    return stoch_k, stoch_d
+    __slots__ = ("period", "_max_q", "_min_q", "_count", "_last_nan", "_k", "_d")   # 固定属性，省去实例 __dict__
+
+    def __init__(self, stoch_period, smooth_k, smooth_d):
+        self.period = stoch_period
+        self._max_q = deque()            # (序号, RSI)，RSI单调递减
+        self._min_q = deque()            # (序号, RSI)，RSI单调递增
+        self._count = 0                  # 已计入的RSI个数
+        self._last_nan = -stoch_period   # 最近一个 NaN RSI 的序号
+        self._k = RollingMean(smooth_k)
+        self._d = RollingMean(smooth_d)
+
+    def push(self, rsi):
+        """一根K线完成：计入它的RSI，更新K、D"""
+        i = self._count
+        self._count = i + 1
+        if rsi != rsi:                   # 数据不足时RSI为 NaN，含它的窗口都没有有效值
+            self._last_nan = i
+        else:
+            max_q, min_q = self._max_q, self._min_q
+            while max_q and max_q[-1][1] <= rsi:
+                max_q.pop()
+            max_q.append((i, rsi))
+            while min_q and min_q[-1][1] >= rsi:
+                min_q.pop()
+            min_q.append((i, rsi))
+            # 移出已滑出窗口的RSI
+            start = i - self.period + 1
+            while max_q[0][0] < start:
+                max_q.popleft()
+            while min_q[0][0] < start:
+                min_q.popleft()
+
+        stoch_raw = float("nan")
+        if rsi == rsi and i + 1 >= self.period and self._last_nan < i - self.period + 1:
+            rsi_max, rsi_min = self._max_q[0][1], self._min_q[0][1]
+            if rsi_max > rsi_min:        # 避免分母为0
+                stoch_raw = (rsi - rsi_min) / (rsi_max - rsi_min)
+
+        self._k.push(stoch_raw)          # 对StochRSI进行平滑得到K线
+        self._d.push(self._k.value)      # 对K线再平滑得到D线（信号线）
+
+    @property
+    def k(self):
+        """当前K值（0~1，数据不足时为 nan）"""
+        return self._k.value
+
+    @property
+    def d(self):
+        """当前D值（0~1，数据不足时为 nan）"""
+        return self._d.value
 
 
 def main():
@@ -196,34 +298,51 @@ def main():
     # 初始化 TargetPosTask，自动管理持仓目标（自动处理追单/撤单/部分成交）
     target_pos = TargetPosTask(api, SYMBOL)
 
+    # StochK/StochD 只依赖最近 STOCH_PERIOD + SMOOTH_K + SMOOTH_D - 2 个RSI，
+    # 重建时只需把这么多根K线逐根计入随机化处理
+    STOCH_WARMUP = STOCH_PERIOD + SMOOTH_K + SMOOTH_D - 2
+    last_bar_id = None   # 上次计入指标的已完成K线 id
+
     try:
         while True:
             api.wait_update()
 
-            # 仅在K线更新时重新计算（提升运行效率）
+            # 仅在新K线出现（上一根K线刚完成）时计算，形成中K线的逐笔变动直接跳过
             if api.is_changing(klines.iloc[-1], "datetime"):
 
-                close = klines["close"]  # 提取收盘价序列
-
-                # ====== 第一步：计算RSI ======
-                rsi = calc_rsi(close, RSI_PERIOD)
+                # ====== 第一步：增量更新RSI ======
+                # 使用已完成K线（-2为最新完成K线），避免用未完成K线的首个tick
+                bar_id = klines.id.iloc[-2]
+                if last_bar_id is None or bar_id != last_bar_id + 1:
+                    # 首次运行（或中间漏掉了K线）：用之前的已完成K线重建RSI状态，
+                    # 最后 STOCH_WARMUP 根逐根递推，建立StochK/StochD的窗口
+                    history = klines["close"].to_numpy()[:-2]
+                    rsi_calc = WilderRSI(RSI_PERIOD)
+                    rsi_calc.seed(history[:-STOCH_WARMUP])
+                    stoch = StochRsiStream(STOCH_PERIOD, SMOOTH_K, SMOOTH_D)
+                    for price in history[-STOCH_WARMUP:].tolist():
+                        rsi_calc.push(price)
+                        stoch.push(rsi_calc.value)
+                    k_prev, d_prev = stoch.k, stoch.d
+
+                rsi_calc.push(float(klines["close"].iloc[-2]))
+                rsi_now = rsi_calc.value     # 当前RSI值
 
                 # ====== 第二步：对RSI做随机化处理，得到StochK和StochD ======
-                stoch_k, stoch_d = calc_stoch_rsi(rsi, STOCH_PERIOD, SMOOTH_K, SMOOTH_D)
+                stoch.push(rsi_now)
+                last_bar_id = bar_id
 
                 # 取最新值用于信号判断
-                k_now   = stoch_k.iloc[-1]   # 当前K值
-                d_now   = stoch_d.iloc[-1]   # 当前D值
-                rsi_now = rsi.iloc[-1]       # 当前RSI值
+                k_now   = stoch.k   # 当前K值
+                d_now   = stoch.d   # 当前D值
 
                 # ====== 第三步：检测K/D交叉信号 ======
-                cross_up_sig   = crossup(stoch_k, stoch_d)    # K上穿D（做多）
-                cross_down_sig = crossdown(stoch_k, stoch_d)  # K下穿D（做空）
-
-                last_cross_up   = bool(cross_up_sig.iloc[-1])   # 最新K线是否发生上穿
-                last_cross_down = bool(cross_down_sig.iloc[-1]) # 最新K线是否发生下穿
+                # 与上一根K线的K/D比较（与 tafunc.crossup/crossdown 相同）
+                last_cross_up   = k_now > d_now and k_prev <= d_prev   # K上穿D（做多）
+                last_cross_down = k_now < d_now and k_prev >= d_prev   # K下穿D（做空）
+                k_prev, d_prev = k_now, d_now
 
-                print(f"[{klines.iloc[-1]['datetime']}] "
+                print(f"[{klines.iloc[-2]['datetime']}] "
                       f"RSI={rsi_now:.2f}, K={k_now:.3f}, D={d_now:.3f}")
 
                 # ====== 交易逻辑 ======